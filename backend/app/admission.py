@@ -0,0 +1,187 @@
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Deque, Dict, List, Optional
+
+from app.config import settings
+from app.metrics import (
+    LLM_ACTIVE_GENERATIONS,
+    LLM_QUEUED_GENERATIONS,
+    LLM_QUEUE_WAIT_SECONDS,
+    LLM_SHED_TOTAL,
+)
+
+PositionCallback = Callable[[int], Awaitable[None]]
+
+
+class AdmissionRejected(Exception):
+    """Raised when a generation is shed because its expected queue wait exceeds the SLO."""
+
+    def __init__(self, estimated_wait: float):
+        super().__init__(f"Estimated queue wait {estimated_wait:.1f}s exceeds SLO")
+        self.estimated_wait = estimated_wait
+
+
+class _Ticket:
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self.granted = False
+        self.position = 0
+        self.changed = asyncio.Event()
+
+
+class AdmissionController:
+    """
+    Limits concurrent LLM generations globally and per user.
+
+    Waiting requests are queued per user and slots are handed out
+    round-robin across users, so one user with many tabs cannot starve
+    others. Requests whose estimated wait exceeds ``slo_seconds`` are
+    rejected up front instead of queueing.
+    """
+
+    EWMA_ALPHA = 0.2
+
+    def __init__(self, max_concurrency: int, max_per_user: int, slo_seconds: float):
+        self.max_concurrency = max_concurrency
+        self.max_per_user = max_per_user
+        self.slo_seconds = slo_seconds
+        self.active = 0
+        self.active_per_user: Dict[str, int] = {}
+        self.queues: Dict[str, Deque[_Ticket]] = {}
+        self.rotation: Deque[str] = deque()
+        self.avg_generation_seconds: Optional[float] = None
+
+    @property
+    def queued(self) -> int:
+        return sum(len(queue) for queue in self.queues.values())
+
+    def _waiting_order(self) -> List[_Ticket]:
+        """Waiting tickets in the order they would be granted under round-robin."""
+        order = []
+        queues = [list(self.queues[user_id]) for user_id in self.rotation]
+        depth = 0
+        while True:
+            layer = [queue[depth] for queue in queues if depth < len(queue)]
+            if not layer:
+                return order
+            order.extend(layer)
+            depth += 1
+
+    def estimated_wait(self, position: int) -> Optional[float]:
+        if self.avg_generation_seconds is None:
+            return None
+        return math.ceil(position / self.max_concurrency) * self.avg_generation_seconds
+
+    def _grant(self, ticket: _Ticket):
+        ticket.granted = True
+        self.active += 1
+        self.active_per_user[ticket.user_id] = self.active_per_user.get(ticket.user_id, 0) + 1
+        ticket.changed.set()
+
+    def _dispatch(self):
+        granted = True
+        while granted and self.active < self.max_concurrency and self.rotation:
+            granted = False
+            for _ in range(len(self.rotation)):
+                user_id = self.rotation[0]
+                self.rotation.rotate(-1)
+                if self.active_per_user.get(user_id, 0) >= self.max_per_user:
+                    continue
+                queue = self.queues[user_id]
+                self._grant(queue.popleft())
+                if not queue:
+                    del self.queues[user_id]
+                    self.rotation.remove(user_id)
+                granted = True
+                break
+
+        for position, ticket in enumerate(self._waiting_order(), start=1):
+            if ticket.position != position:
+                ticket.position = position
+                ticket.changed.set()
+        self._update_gauges()
+
+    def _remove(self, ticket: _Ticket):
+        queue = self.queues.get(ticket.user_id)
+        if queue and ticket in queue:
+            queue.remove(ticket)
+            if not queue:
+                del self.queues[ticket.user_id]
+                self.rotation.remove(ticket.user_id)
+
+    def _release(self, user_id: str, elapsed: Optional[float]):
+        self.active -= 1
+        self.active_per_user[user_id] -= 1
+        if not self.active_per_user[user_id]:
+            del self.active_per_user[user_id]
+        if elapsed is not None:
+            if self.avg_generation_seconds is None:
+                self.avg_generation_seconds = elapsed
+            else:
+                self.avg_generation_seconds += self.EWMA_ALPHA * (elapsed - self.avg_generation_seconds)
+        self._dispatch()
+
+    def _update_gauges(self):
+        LLM_ACTIVE_GENERATIONS.set(self.active)
+        LLM_QUEUED_GENERATIONS.set(self.queued)
+
+    async def acquire(self, user_id: str, on_position: Optional[PositionCallback] = None):
+        ticket = _Ticket(user_id)
+        if user_id not in self.queues:
+            self.queues[user_id] = deque()
+            self.rotation.append(user_id)
+        self.queues[user_id].append(ticket)
+        self._dispatch()
+        if ticket.granted:
+            LLM_QUEUE_WAIT_SECONDS.observe(0)
+            return
+
+        estimate = self.estimated_wait(ticket.position)
+        if self.slo_seconds and estimate is not None and estimate > self.slo_seconds:
+            self._remove(ticket)
+            self._dispatch()
+            LLM_SHED_TOTAL.inc()
+            raise AdmissionRejected(estimate)
+
+        started = time.perf_counter()
+        reported = None
+        try:
+            while True:
+                ticket.changed.clear()
+                if ticket.granted:
+                    break
+                if on_position and ticket.position != reported:
+                    reported = ticket.position
+                    await on_position(reported)
+                    continue
+                await ticket.changed.wait()
+        except BaseException:
+            if ticket.granted:
+                self._release(user_id, None)
+            else:
+                self._remove(ticket)
+                self._dispatch()
+            raise
+        LLM_QUEUE_WAIT_SECONDS.observe(time.perf_counter() - started)
+
+    @asynccontextmanager
+    async def slot(self, user_id: str, on_position: Optional[PositionCallback] = None):
+        """Holds a generation slot for the duration of the block."""
+        await self.acquire(user_id, on_position)
+        started = time.perf_counter()
+        completed = False
+        try:
+            yield
+            completed = True
+        finally:
+            self._release(user_id, time.perf_counter() - started if completed else None)
+
+
+admission_controller = AdmissionController(
+    max_concurrency=settings.LLM_MAX_CONCURRENCY,
+    max_per_user=settings.LLM_MAX_CONCURRENCY_PER_USER,
+    slo_seconds=settings.LLM_QUEUE_SLO_SECONDS,
+)
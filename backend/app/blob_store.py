@@ -0,0 +1,94 @@
+import asyncio
+import gzip
+import hashlib
+import os
+import tempfile
+import time
+from typing import Dict
+from app.config import settings
+
+
+class BlobStore:
+    """
+    Content-addressed storage for extracted file text on local disk.
+
+    Blobs are gzip-compressed and keyed by the SHA-256 of their text, so
+    identical uploads share one blob.
+    """
+
+    def __init__(self, root: str = None):
+        self.root = root or settings.BLOB_STORE_PATH
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], f"{digest}.gz")
+
+    def _write(self, digest: str, data: bytes):
+        path = self._path(digest)
+        if os.path.exists(path):
+            # Refresh the mtime so garbage collection treats it as newly referenced
+            os.utime(path)
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(gzip.compress(data))
+            os.replace(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+    def _read(self, digest: str) -> bytes:
+        with open(self._path(digest), "rb") as f:
+            return gzip.decompress(f.read())
+
+    def _delete(self, digest: str, min_age_seconds: float) -> int:
+        path = self._path(digest)
+        try:
+            stat = os.stat(path)
+            if stat.st_mtime > time.time() - min_age_seconds:
+                return 0
+            os.remove(path)
+            return stat.st_size
+        except FileNotFoundError:
+            return 0
+
+    def list_blobs(self, min_age_seconds: float = 0) -> Dict[str, int]:
+        """Maps each stored digest to its size, skipping blobs written within ``min_age_seconds``."""
+        cutoff = time.time() - min_age_seconds
+        blobs: Dict[str, int] = {}
+        for prefix in os.listdir(self.root):
+            prefix_dir = os.path.join(self.root, prefix)
+            if not os.path.isdir(prefix_dir):
+                continue
+            with os.scandir(prefix_dir) as entries:
+                for entry in entries:
+                    if not entry.name.endswith(".gz"):
+                        continue
+                    stat = entry.stat()
+                    if stat.st_mtime <= cutoff:
+                        blobs[entry.name[:-3]] = stat.st_size
+        return blobs
+
+    async def put(self, text: str) -> str:
+        """Stores text and returns its content hash."""
+        data = text.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        await asyncio.to_thread(self._write, digest, data)
+        return digest
+
+    async def get(self, digest: str) -> str:
+        data = await asyncio.to_thread(self._read, digest)
+        return data.decode("utf-8")
+
+    async def delete(self, digest: str, min_age_seconds: float = 0) -> int:
+        """
+        Removes a blob and returns the number of bytes freed. Blobs written
+        within ``min_age_seconds`` are kept, since an upload may be about to
+        reference them.
+        """
+        return await asyncio.to_thread(self._delete, digest, min_age_seconds)
+
+
+blob_store = BlobStore()
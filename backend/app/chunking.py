@@ -0,0 +1,219 @@
+import hashlib
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+")
+FALLBACK_TOKEN_PATTERN = re.compile(r"\S+\s*")
+MARKDOWN_HEADING_PATTERN = re.compile(r"^#{1,6}\s+(.+)$")
+
+
+@dataclass
+class Block:
+    """A structural unit of an extracted document."""
+    text: str
+    kind: str = "paragraph"  # "heading", "paragraph" or "table"
+    page: Optional[int] = None
+    heading: Optional[str] = None
+
+
+@dataclass
+class Chunk:
+    text: str
+    metadata: Dict = field(default_factory=dict)
+
+
+def chunk_hash(text: str) -> str:
+    """Hashes chunk text with whitespace and case normalized, for deduplication."""
+    normalized = " ".join(text.split()).lower()
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+def blocks_to_text(blocks: List[Block]) -> str:
+    return "\n\n".join(block.text for block in blocks)
+
+
+def blocks_from_text(text: str, page: Optional[int] = None) -> List[Block]:
+    """Splits plain text into paragraphs, treating markdown-style lines as headings."""
+    blocks = []
+    heading = None
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        match = MARKDOWN_HEADING_PATTERN.match(paragraph)
+        if match and "\n" not in paragraph:
+            heading = match.group(1).strip()
+            blocks.append(Block(text=paragraph, kind="heading", page=page, heading=heading))
+        else:
+            blocks.append(Block(text=paragraph, page=page, heading=heading))
+    return blocks
+
+
+class Tokenizer:
+    """
+    Counts tokens with tiktoken. If the encoding cannot be loaded (e.g. no
+    network access to fetch it), falls back to whitespace-delimited words.
+    """
+
+    def __init__(self, encoding_name: str):
+        self.encoding_name = encoding_name
+        self._encoding = None
+        self._loaded = False
+
+    def _load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            import tiktoken
+            self._encoding = tiktoken.get_encoding(self.encoding_name)
+        except Exception as e:
+            logger.warning(
+                "Tokenizer %s unavailable (%s); using word-based token estimates",
+                self.encoding_name, e
+            )
+
+    @property
+    def name(self) -> str:
+        self._load()
+        return self.encoding_name if self._encoding else "words"
+
+    def encode(self, text: str) -> list:
+        self._load()
+        if self._encoding:
+            return self._encoding.encode(text, disallowed_special=())
+        return FALLBACK_TOKEN_PATTERN.findall(text)
+
+    def decode(self, tokens: list) -> str:
+        if self._encoding:
+            return self._encoding.decode(tokens)
+        return "".join(tokens)
+
+    def count(self, text: str) -> int:
+        return len(self.encode(text))
+
+
+class TokenChunker:
+    """
+    Packs document blocks into chunks of at most ``max_tokens``.
+
+    Chunks never span a page or a heading, and blocks are only cut when a
+    single block is larger than a chunk: tables by row, paragraphs by
+    sentence, and as a last resort by tokens with ``overlap_tokens`` of
+    overlap. Whole blocks are never duplicated between chunks.
+    """
+
+    def __init__(self, tokenizer: Tokenizer, max_tokens: int, overlap_tokens: int):
+        self.tokenizer = tokenizer
+        self.max_tokens = max_tokens
+        self.overlap_tokens = min(overlap_tokens, max_tokens // 2)
+
+    def chunk(self, blocks: List[Block]) -> List[Chunk]:
+        chunks: List[Chunk] = []
+        parts: List[str] = []
+        part_tokens = 0
+        pending_headings: List[str] = []
+        page = None
+        heading = None
+
+        def flush():
+            nonlocal part_tokens
+            if parts:
+                chunks.append(self._make_chunk("\n\n".join(parts), page, heading))
+                parts.clear()
+                part_tokens = 0
+
+        for block in blocks:
+            if block.kind == "heading":
+                flush()
+                pending_headings.append(block.text)
+                continue
+
+            if parts and block.page != page:
+                flush()
+
+            text = "\n\n".join(pending_headings + [block.text])
+            tokens = self.tokenizer.count(text)
+
+            if tokens > self.max_tokens:
+                flush()
+                page, heading = block.page, block.heading
+                for piece in self._split_block(block, pending_headings):
+                    chunks.append(self._make_chunk(piece, page, heading))
+                pending_headings = []
+                continue
+
+            # Parts are joined by a blank line, which costs roughly one token
+            if parts and part_tokens + 1 + tokens > self.max_tokens:
+                flush()
+            if not parts:
+                page, heading = block.page, block.heading
+            part_tokens += tokens + (1 if parts else 0)
+            parts.append(text)
+            pending_headings = []
+
+        flush()
+        if pending_headings and not chunks:
+            chunks.append(self._make_chunk("\n\n".join(pending_headings), page, heading))
+
+        for i, chunk in enumerate(chunks):
+            chunk.metadata["chunk_index"] = i
+        return chunks
+
+    def _make_chunk(self, text: str, page: Optional[int], heading: Optional[str]) -> Chunk:
+        metadata = {}
+        if page is not None:
+            metadata["page"] = page
+        if heading:
+            metadata["heading"] = heading
+        return Chunk(text=text, metadata=metadata)
+
+    def _split_block(self, block: Block, headings: List[str]) -> List[str]:
+        if block.kind == "table":
+            units = block.text.split("\n")
+            separator = "\n"
+        else:
+            units = SENTENCE_PATTERN.split(block.text)
+            separator = " "
+        pieces = self._pack(units, separator)
+        if headings and pieces:
+            pieces[0] = "\n\n".join(headings + [pieces[0]])
+        return pieces
+
+    def _pack(self, units: List[str], separator: str) -> List[str]:
+        pieces: List[str] = []
+        current: List[str] = []
+        current_tokens = 0
+        separator_tokens = self.tokenizer.count(separator) if separator.strip() else 0
+
+        for unit in units:
+            tokens = self.tokenizer.count(unit)
+            if tokens > self.max_tokens:
+                if current:
+                    pieces.append(separator.join(current))
+                    current, current_tokens = [], 0
+                pieces.extend(self._split_tokens(unit))
+                continue
+            if current and current_tokens + separator_tokens + tokens > self.max_tokens:
+                pieces.append(separator.join(current))
+                current, current_tokens = [], 0
+            current.append(unit)
+            current_tokens += tokens + (separator_tokens if len(current) > 1 else 0)
+
+        if current:
+            pieces.append(separator.join(current))
+        return pieces
+
+    def _split_tokens(self, text: str) -> List[str]:
+        tokens = self.tokenizer.encode(text)
+        step = self.max_tokens - self.overlap_tokens
+        pieces = []
+        for start in range(0, len(tokens), step):
+            pieces.append(self.tokenizer.decode(tokens[start:start + self.max_tokens]))
+            if start + self.max_tokens >= len(tokens):
+                break
+        return pieces
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Optional
 
 
 class Settings(BaseSettings):
@@ -11,10 +11,23 @@ class Settings(BaseSettings):
     # MongoDB
     MONGODB_URI: str
     MONGODB_DB_NAME: str
+    MONGODB_MAX_POOL_SIZE: int = 100
+    MONGODB_MIN_POOL_SIZE: int = 0
+    MONGODB_MAX_IDLE_TIME_MS: Optional[int] = None
+    MONGODB_CONNECT_TIMEOUT_MS: int = 20000
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS: int = 30000
+    MONGODB_SOCKET_TIMEOUT_MS: Optional[int] = None
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS: Optional[int] = None
+    MONGODB_COMPRESSORS: str = ""  # e.g. "zstd,snappy,zlib"; zstd and snappy need extra packages
+    
+    # Write-behind batching of message inserts and session timestamps (0 writes through)
+    WRITE_BUFFER_MAX_DELAY_MS: int = 50
+    WRITE_BUFFER_MAX_OPERATIONS: int = 500
     
     # OpenAI
     OPENAI_API_KEY: str
     OPENAI_MODEL: str = "gpt-5.2"
+    OPENAI_BASE_URL: Optional[str] = None
     
     # JWT
     JWT_SECRET_KEY: str
@@ -24,12 +37,43 @@ class Settings(BaseSettings):
     # Vector Store
     FAISS_INDEX_PATH: str = "./vector_store/faiss_index"
     EMBEDDING_MODEL: str = "text-embedding-3-large"
+    EMBEDDING_CHECK_CTX_LENGTH: bool = True
+    CHUNKER: str = "token"  # "token" (structure-aware) or "character" (legacy splitter)
+    CHUNK_TOKENS: int = 400
+    CHUNK_OVERLAP_TOKENS: int = 40
+    TOKENIZER_ENCODING: str = "cl100k_base"
     CHUNK_SIZE: int = 1000
     CHUNK_OVERLAP: int = 200
     
+    # Startup index preloading
+    PRELOAD_INDEXES: bool = False
+    PRELOAD_MAX_SESSIONS: int = 200
+    PRELOAD_MEMORY_BUDGET_MB: int = 512
+    
+    # Bulk uploads
+    BULK_UPLOAD_MAX_FILES: int = 500
+    BULK_UPLOAD_MAX_BYTES: int = 200 * 1024 * 1024
+    EXTRACTION_CONCURRENCY: int = 4
+    
+    # Extracted file text
+    BLOB_STORE_PATH: str = "./blob_store"
+    
+    # Garbage collection of orphaned indexes and blobs (0 disables the periodic job)
+    GC_INTERVAL_SECONDS: int = 3600
+    GC_GRACE_SECONDS: int = 600
+    
+    # LLM admission control (LLM_QUEUE_SLO_SECONDS=0 disables load shedding)
+    LLM_MAX_CONCURRENCY: int = 16
+    LLM_MAX_CONCURRENCY_PER_USER: int = 2
+    LLM_QUEUE_SLO_SECONDS: float = 30.0
+    
     # CORS
     CORS_ORIGINS: str = "http://localhost:3000"
     
+    @property
+    def mongodb_compressors_list(self) -> List[str]:
+        return [name.strip() for name in self.MONGODB_COMPRESSORS.split(",") if name.strip()]
+    
     @property
     def cors_origins_list(self) -> List[str]:
         return [origin.strip() for origin in self.CORS_ORIGINS.split(",")]
@@ -1,14 +1,38 @@
 from motor.motor_asyncio import AsyncIOMotorClient
 from typing import Optional
 from app.config import settings
+from app.metrics import MongoCommandListener
 
 class Database:
     client: Optional[AsyncIOMotorClient] = None
     
     @classmethod
     async def connect_db(cls):
-        cls.client = AsyncIOMotorClient(settings.MONGODB_URI)
+        options = {}
+        if settings.mongodb_compressors_list:
+            options["compressors"] = settings.mongodb_compressors_list
+        cls.client = AsyncIOMotorClient(
+            settings.MONGODB_URI,
+            maxPoolSize=settings.MONGODB_MAX_POOL_SIZE,
+            minPoolSize=settings.MONGODB_MIN_POOL_SIZE,
+            maxIdleTimeMS=settings.MONGODB_MAX_IDLE_TIME_MS,
+            connectTimeoutMS=settings.MONGODB_CONNECT_TIMEOUT_MS,
+            serverSelectionTimeoutMS=settings.MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+            socketTimeoutMS=settings.MONGODB_SOCKET_TIMEOUT_MS,
+            waitQueueTimeoutMS=settings.MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+            event_listeners=[MongoCommandListener()],
+            **options
+        )
         
+    @classmethod
+    async def ensure_indexes(cls):
+        """Creates the indexes backing pagination and per-session lookups."""
+        db = cls.get_database()
+        await db.chat_sessions.create_index([("user_id", 1), ("updated_at", -1), ("_id", -1)])
+        await db.messages.create_index([("session_id", 1), ("timestamp", 1), ("_id", 1)])
+        await db.files.create_index("session_id")
+        await db.files.create_index("content_hash")
+    
     @classmethod
     async def close_db(cls):
         if cls.client:
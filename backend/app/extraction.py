@@ -0,0 +1,62 @@
+import io
+from typing import List
+from app.chunking import Block, blocks_from_text
+
+SUPPORTED_EXTENSIONS = (".pdf", ".docx", ".txt")
+
+def _docx_blocks(content: bytes) -> List[Block]:
+    import docx
+    import docx.table
+    
+    doc = docx.Document(io.BytesIO(content))
+    blocks = []
+    heading = None
+    for item in doc.iter_inner_content():
+        if isinstance(item, docx.table.Table):
+            rows = []
+            for row in item.rows:
+                cells = []
+                previous = None
+                for cell in row.cells:
+                    # A horizontally merged cell is repeated once per grid column
+                    # as the same element; compare identity, not text
+                    if cell._tc is previous:
+                        continue
+                    previous = cell._tc
+                    cells.append(cell.text.strip())
+                rows.append(" | ".join(cells))
+            if any(rows):
+                blocks.append(Block(text="\n".join(rows), kind="table", heading=heading))
+            continue
+
+        text = item.text.strip()
+        if not text:
+            continue
+        style = item.style.name if item.style is not None else ""
+        if style.startswith("Heading") or style == "Title":
+            heading = text
+            blocks.append(Block(text=text, kind="heading", heading=heading))
+        else:
+            blocks.append(Block(text=text, heading=heading))
+    return blocks
+
+
+def extract_blocks(filename: str, content: bytes) -> List[Block]:
+    """Extracts a document into structural blocks, keeping page numbers, headings and tables."""
+    filename = filename.lower()
+    if filename.endswith(".pdf"):
+        import pypdf
+        pdf_reader = pypdf.PdfReader(io.BytesIO(content))
+        blocks = []
+        for page_number, page in enumerate(pdf_reader.pages, start=1):
+            blocks.extend(blocks_from_text(page.extract_text() or "", page=page_number))
+        return blocks
+
+    elif filename.endswith(".docx"):
+        return _docx_blocks(content)
+
+    elif filename.endswith(".txt"):
+        return blocks_from_text(content.decode("utf-8"))
+
+    else:
+        raise ValueError("Unsupported file type")
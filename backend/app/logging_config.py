@@ -0,0 +1,40 @@
+import copy
+from typing import Dict
+
+from uvicorn.config import LOGGING_CONFIG as UVICORN_LOGGING_CONFIG
+
+
+def build_logging_config(level: str = "INFO") -> Dict:
+    """
+    Returns a dictConfig for uvicorn's ``log_config``: uvicorn's defaults,
+    plus a root handler that tags records with the request id, ``level``
+    for the ``app`` loggers, and a message-only handler for the JSON lines
+    of ``app.trace``. App loggers keep propagating, so a deployment can
+    replace this config wholesale.
+    """
+    config = copy.deepcopy(UVICORN_LOGGING_CONFIG)
+    config["filters"] = {
+        "request_id": {"()": "app.metrics.RequestIdFilter"},
+    }
+    config["formatters"].update({
+        "app": {"format": "%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s"},
+        "trace": {"format": "%(message)s"},
+    })
+    config["handlers"].update({
+        "app": {
+            "class": "logging.StreamHandler",
+            "formatter": "app",
+            "filters": ["request_id"],
+            "stream": "ext://sys.stderr",
+        },
+        "trace": {
+            "class": "logging.StreamHandler",
+            "formatter": "trace",
+            "stream": "ext://sys.stderr",
+        },
+    })
+    # Third-party libraries log at WARNING; app loggers at ``level``, via the root handler
+    config["root"] = {"handlers": ["app"], "level": "WARNING"}
+    config["loggers"]["app"] = {"level": level}
+    config["loggers"]["app.trace"] = {"handlers": ["trace"], "level": "INFO", "propagate": False}
+    return config
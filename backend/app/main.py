@@ -1,16 +1,50 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+import time
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
 from app.config import settings
+from app.startup import preload_indexes, startup_state, warm_up
 from app.database import Database
+from app.pagination import NEXT_CURSOR_HEADER
+from app.maintenance import migrate_legacy_file_text, run_periodic_gc
+from app.write_buffer import write_buffer
+from app.metrics import HTTP_REQUEST_SECONDS, new_request_id, render_metrics, request_id_var
 from app.routes import auth_routes, chat_routes, file_routes
 
+logger = logging.getLogger(__name__)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await Database.connect_db()
+    try:
+        await Database.ensure_indexes()
+    except Exception:
+        logger.exception("Failed to create MongoDB indexes")
+    try:
+        await migrate_legacy_file_text(Database.get_database())
+    except Exception:
+        logger.exception("Failed to migrate legacy file text to the blob store")
+    
+    # Heavy imports and client setup happen here, off the loop, rather than in the first request
+    await asyncio.to_thread(warm_up)
+    
+    background_tasks = []
+    if settings.GC_INTERVAL_SECONDS > 0:
+        background_tasks.append(asyncio.create_task(run_periodic_gc()))
+    if settings.PRELOAD_INDEXES:
+        background_tasks.append(asyncio.create_task(preload_indexes(Database.get_database())))
+    
+    startup_state.mark_started()
     yield
+    
+    for task in background_tasks:
+        task.cancel()
+    await write_buffer.close()
     await Database.close_db()
 
 
@@ -26,8 +60,27 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "X-Request-ID"],
 )
 
+@app.middleware("http")
+async def instrument_requests(request: Request, call_next):
+    request_id = request.headers.get("X-Request-ID") or new_request_id()
+    request_id_var.set(request_id)
+    started = time.perf_counter()
+    
+    response = await call_next(request)
+    
+    route = request.scope.get("route")
+    HTTP_REQUEST_SECONDS.labels(
+        request.method,
+        route.path if route else "unmatched",
+        str(response.status_code)
+    ).observe(time.perf_counter() - started)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
+
 app.include_router(auth_routes.router)
 app.include_router(chat_routes.router)
 app.include_router(file_routes.router)
@@ -40,4 +93,16 @@ async def root():
 
 @app.get("/health")
 async def health():
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy"}
+
+
+@app.get("/ready")
+async def ready():
+    report = startup_state.report()
+    return JSONResponse(report, status_code=200 if startup_state.ready else 503)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    payload, content_type = render_metrics()
+    return Response(content=payload, media_type=content_type)
\ No newline at end of file
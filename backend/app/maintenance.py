@@ -0,0 +1,163 @@
+import asyncio
+import logging
+from typing import Dict, List
+from bson import ObjectId
+
+from app.blob_store import blob_store
+from app.config import settings
+from app.database import Database
+from app.metrics import GC_RECLAIMED_BYTES
+from app.vector_store import vector_store
+from app.write_buffer import write_buffer
+
+logger = logging.getLogger(__name__)
+
+LOOKUP_BATCH_SIZE = 1000
+
+
+async def purge_session_data(db, session_id: str, content_hashes: List[str]) -> Dict:
+    """
+    Removes everything that belongs to an already-deleted session: messages,
+    file documents, the on-disk index and blobs no other file references.
+    """
+    await write_buffer.wait_for_session(session_id)
+    messages = await db.messages.delete_many({"session_id": session_id})
+    files = await db.files.delete_many({"session_id": session_id})
+    vector_store.evict(session_id)
+    index_bytes = await asyncio.to_thread(vector_store.delete_index_files, session_id)
+
+    blob_bytes = 0
+    for content_hash in content_hashes:
+        if content_hash and not await db.files.find_one({"content_hash": content_hash}, {"_id": 1}):
+            blob_bytes += await blob_store.delete(content_hash, settings.GC_GRACE_SECONDS)
+
+    report = {
+        "session_id": session_id,
+        "messages_deleted": messages.deleted_count,
+        "files_deleted": files.deleted_count,
+        "index_bytes": index_bytes,
+        "blob_bytes": blob_bytes,
+    }
+    logger.info("Purged session data: %s", report)
+    return report
+
+
+async def _live_session_ids(db, session_ids: List[str]) -> set:
+    live = set()
+    candidates = [sid for sid in session_ids if ObjectId.is_valid(sid)]
+    for start in range(0, len(candidates), LOOKUP_BATCH_SIZE):
+        batch = [ObjectId(sid) for sid in candidates[start:start + LOOKUP_BATCH_SIZE]]
+        async for session in db.chat_sessions.find({"_id": {"$in": batch}}, {"_id": 1}):
+            live.add(str(session["_id"]))
+    return live
+
+
+async def _referenced_hashes(db, digests: List[str]) -> set:
+    referenced = set()
+    for start in range(0, len(digests), LOOKUP_BATCH_SIZE):
+        batch = digests[start:start + LOOKUP_BATCH_SIZE]
+        referenced.update(await db.files.distinct("content_hash", {"content_hash": {"$in": batch}}))
+    return referenced
+
+
+async def _delete_orphaned_documents(db) -> Dict[str, int]:
+    """Deletes messages and files whose session no longer exists."""
+    deleted = {}
+    for collection in (db.messages, db.files):
+        session_ids = await collection.distinct("session_id")
+        live = await _live_session_ids(db, session_ids)
+        orphaned = [sid for sid in session_ids if sid not in live]
+        count = 0
+        for start in range(0, len(orphaned), LOOKUP_BATCH_SIZE):
+            result = await collection.delete_many(
+                {"session_id": {"$in": orphaned[start:start + LOOKUP_BATCH_SIZE]}}
+            )
+            count += result.deleted_count
+        deleted[collection.name] = count
+    return deleted
+
+
+async def collect_garbage(db) -> Dict:
+    """
+    Reconciles MongoDB, FAISS_INDEX_PATH and the blob store: deletes
+    messages and files of sessions that no longer exist (e.g. left by an
+    interrupted purge or written by a socket that outlived its session),
+    then index files of missing sessions and unreferenced blobs.
+    Artifacts younger than GC_GRACE_SECONDS are left alone so in-flight
+    uploads are never collected.
+    """
+    # Orphaned file documents still reference their blobs, so drop them first
+    orphaned_documents = await _delete_orphaned_documents(db)
+    
+    persisted = await asyncio.to_thread(vector_store.persisted_sessions, settings.GC_GRACE_SECONDS)
+    live = await _live_session_ids(db, list(persisted))
+    orphaned_sessions = [sid for sid in persisted if sid not in live]
+    index_bytes = 0
+    for session_id in orphaned_sessions:
+        vector_store.evict(session_id)
+        index_bytes += await asyncio.to_thread(vector_store.delete_index_files, session_id)
+
+    resident = list(vector_store.indexes)
+    resident_live = await _live_session_ids(db, resident)
+    for session_id in resident:
+        if session_id not in resident_live:
+            vector_store.evict(session_id)
+
+    blobs = await asyncio.to_thread(blob_store.list_blobs, settings.GC_GRACE_SECONDS)
+    referenced = await _referenced_hashes(db, list(blobs))
+    orphaned_blobs = [digest for digest in blobs if digest not in referenced]
+    blob_bytes = 0
+    for digest in orphaned_blobs:
+        blob_bytes += await blob_store.delete(digest, settings.GC_GRACE_SECONDS)
+
+    GC_RECLAIMED_BYTES.labels("index").inc(index_bytes)
+    GC_RECLAIMED_BYTES.labels("blob").inc(blob_bytes)
+
+    report = {
+        "orphaned_messages": orphaned_documents["messages"],
+        "orphaned_files": orphaned_documents["files"],
+        "orphaned_indexes": len(orphaned_sessions),
+        "orphaned_blobs": len(orphaned_blobs),
+        "index_bytes": index_bytes,
+        "blob_bytes": blob_bytes,
+        "reclaimed_bytes": index_bytes + blob_bytes,
+    }
+    logger.info("Garbage collection finished: %s", report)
+    return report
+
+
+async def migrate_legacy_file_text(db) -> int:
+    """
+    Moves ``content_text`` of file documents written before the blob store
+    into it, replacing the field with ``content_hash``. Each blob is read
+    back before the text is unset, so the only copy is never dropped.
+    Idempotent; returns the number of documents migrated.
+    """
+    migrated = 0
+    cursor = db.files.find({"content_text": {"$exists": True}}, {"content_text": 1})
+    async for file_doc in cursor:
+        text = file_doc["content_text"] or ""
+        content_hash = await blob_store.put(text)
+        if await blob_store.get(content_hash) != text:
+            logger.error("Blob %s did not round-trip; keeping content_text of file %s", content_hash, file_doc["_id"])
+            continue
+        await db.files.update_one(
+            {"_id": file_doc["_id"]},
+            {"$set": {"content_hash": content_hash}, "$unset": {"content_text": ""}}
+        )
+        migrated += 1
+    if migrated:
+        logger.info("Moved the extracted text of %d file(s) to the blob store", migrated)
+    return migrated
+
+
+async def run_periodic_gc():
+    """Runs collect_garbage every GC_INTERVAL_SECONDS until cancelled."""
+    while True:
+        await asyncio.sleep(settings.GC_INTERVAL_SECONDS)
+        try:
+            await collect_garbage(Database.get_database())
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Garbage collection failed")
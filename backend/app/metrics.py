@@ -0,0 +1,215 @@
+import json
+import logging
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from pymongo import monitoring
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# LLM generation
+TIME_TO_FIRST_TOKEN = Histogram(
+    "chat_time_to_first_token_seconds",
+    "Time from the start of a generation to the first streamed token",
+    ["rag"],
+    buckets=LATENCY_BUCKETS,
+)
+GENERATION_SECONDS = Histogram(
+    "chat_generation_seconds",
+    "Total time spent streaming a single assistant response",
+    ["rag"],
+    buckets=LATENCY_BUCKETS,
+)
+GENERATION_CHUNKS = Counter(
+    "chat_generation_chunks_total",
+    "Number of streamed chunks sent to clients",
+)
+
+# Vector store
+EMBEDDING_SECONDS = Histogram(
+    "embedding_request_seconds",
+    "Latency of embedding API calls",
+    ["kind"],
+    buckets=LATENCY_BUCKETS,
+)
+FAISS_SEARCH_SECONDS = Histogram(
+    "faiss_search_seconds",
+    "Latency of FAISS similarity searches",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0),
+)
+LOADED_INDEXES = Gauge(
+    "vector_store_loaded_indexes",
+    "Number of session indexes resident in memory",
+)
+LOADED_INDEX_BYTES = Gauge(
+    "vector_store_loaded_bytes",
+    "Approximate memory held by resident session indexes and their chunks",
+)
+
+# MongoDB
+MONGO_COMMAND_SECONDS = Histogram(
+    "mongo_command_seconds",
+    "Latency of MongoDB commands per collection",
+    ["collection", "command"],
+    buckets=LATENCY_BUCKETS,
+)
+MONGO_COMMAND_FAILURES = Counter(
+    "mongo_command_failures_total",
+    "Failed MongoDB commands per collection",
+    ["collection", "command"],
+)
+
+# Uploads
+UPLOAD_STAGE_SECONDS = Histogram(
+    "upload_stage_seconds",
+    "Latency of each file ingestion stage",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+
+# Maintenance
+GC_RECLAIMED_BYTES = Counter(
+    "gc_reclaimed_bytes_total",
+    "Bytes reclaimed by deleting orphaned indexes and blobs",
+    ["kind"],
+)
+
+# Startup
+STARTUP_SECONDS = Gauge(
+    "app_startup_seconds",
+    "Time from importing the app to the end of the lifespan startup phase",
+)
+
+# Write-behind buffer
+WRITE_BUFFER_BATCH_OPERATIONS = Histogram(
+    "write_buffer_batch_operations",
+    "Number of buffered MongoDB operations written per flush",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000),
+)
+WRITE_BUFFER_FAILURES = Counter(
+    "write_buffer_flush_failures_total",
+    "Flushes of the write-behind buffer that raised",
+)
+
+# LLM admission control
+LLM_ACTIVE_GENERATIONS = Gauge(
+    "llm_active_generations",
+    "Number of LLM generations currently holding a slot",
+)
+LLM_QUEUED_GENERATIONS = Gauge(
+    "llm_queued_generations",
+    "Number of LLM generations waiting for a slot",
+)
+LLM_QUEUE_WAIT_SECONDS = Histogram(
+    "llm_queue_wait_seconds",
+    "Time a generation waited for a slot",
+    buckets=LATENCY_BUCKETS,
+)
+LLM_SHED_TOTAL = Counter(
+    "llm_shed_total",
+    "Generations rejected because the expected queue wait exceeded the SLO",
+)
+
+# Connections and HTTP
+ACTIVE_WEBSOCKETS = Gauge(
+    "websocket_active_connections",
+    "Number of open chat WebSocket connections",
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_seconds",
+    "Latency of HTTP requests per route",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+
+class RequestIdFilter(logging.Filter):
+    """Adds the current HTTP request or chat turn id to log records as ``request_id``."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get() or "-"
+        return True
+
+
+# Handlers and formatting are installed by app.logging_config (run.py), not on import
+trace_logger = logging.getLogger("app.trace")
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Returns the current metrics payload and its content type."""
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+class TurnTrace:
+    """Collects the timings of one chat turn and logs them as a single JSON line."""
+
+    def __init__(self, session_id: str, user_id: str):
+        self.request_id = new_request_id()
+        self.session_id = session_id
+        self.user_id = user_id
+        self.started = time.perf_counter()
+        self.timings: Dict[str, float] = {}
+        self.fields: Dict = {}
+        request_id_var.set(self.request_id)
+
+    def mark(self, name: str):
+        self.timings[name] = round((time.perf_counter() - self.started) * 1000, 2)
+
+    def emit(self, **fields):
+        self.mark("total")
+        self.fields.update(fields)
+        trace_logger.info(json.dumps({
+            "event": "chat_turn",
+            "request_id": self.request_id,
+            "session_id": self.session_id,
+            "user_id": self.user_id,
+            "timings_ms": self.timings,
+            **self.fields,
+        }, default=str))
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Records per-collection MongoDB command latency from driver events."""
+
+    def __init__(self):
+        self._pending: Dict[Tuple, str] = {}
+
+    @staticmethod
+    def _key(event) -> Tuple:
+        return (event.connection_id, event.request_id)
+
+    def started(self, event):
+        target = event.command.get(event.command_name)
+        if not isinstance(target, str):
+            target = event.command.get("collection")
+        if isinstance(target, str):
+            self._pending[self._key(event)] = target
+
+    def succeeded(self, event):
+        collection = self._pending.pop(self._key(event), None)
+        if collection is not None:
+            MONGO_COMMAND_SECONDS.labels(collection, event.command_name).observe(
+                event.duration_micros / 1_000_000
+            )
+
+    def failed(self, event):
+        collection = self._pending.pop(self._key(event), None)
+        if collection is not None:
+            MONGO_COMMAND_FAILURES.labels(collection, event.command_name).inc()
@@ -33,6 +33,8 @@ class ChatSessionModel(BaseModel):
     id: Optional[PyObjectId] = Field(alias="_id", default=None)
     user_id: str
     title: str = "New Chat"
+    file_count: int = 0
+    filenames: List[str] = []
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     
@@ -62,7 +64,7 @@ class FileModel(BaseModel):
     filename: str
     file_type: str
     file_size: int
-    content_text: Optional[str] = None
+    content_hash: Optional[str] = None
     uploaded_at: datetime = Field(default_factory=datetime.utcnow)
     vectorized: bool = False
     
@@ -0,0 +1,50 @@
+import base64
+import json
+from datetime import datetime, timezone
+from typing import Optional, Tuple
+from bson import ObjectId
+from fastapi import HTTPException
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(sort_value: datetime, doc_id: ObjectId) -> str:
+    """Encodes the sort key of the last returned document as an opaque cursor."""
+    raw = json.dumps([sort_value.isoformat(), str(doc_id)]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    try:
+        sort_value, doc_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(sort_value), ObjectId(doc_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def parse_since(since: Optional[str]) -> Optional[datetime]:
+    if since is None:
+        return None
+    try:
+        parsed = datetime.fromisoformat(since.replace("Z", "+00:00"))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid 'since' timestamp")
+    # Stored timestamps are naive UTC
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def keyset_filter(field: str, cursor: Optional[str], descending: bool) -> dict:
+    """
+    Builds the filter selecting documents strictly after the cursor in
+    (field, _id) order, so each page is an index seek rather than a skip.
+    """
+    if not cursor:
+        return {}
+    sort_value, doc_id = decode_cursor(cursor)
+    op = "$lt" if descending else "$gt"
+    return {"$or": [
+        {field: {op: sort_value}},
+        {field: sort_value, "_id": {op: doc_id}},
+    ]}
@@ -1,19 +1,13 @@
+import time
+from functools import cached_property
 from typing import List, Dict, AsyncGenerator
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 from app.config import settings
 from app.vector_store import vector_store
+from app.metrics import TIME_TO_FIRST_TOKEN, GENERATION_SECONDS
 
 
 class RAGEngine:
     def __init__(self):
-        self.llm = ChatOpenAI(
-            model=settings.OPENAI_MODEL,
-            openai_api_key=settings.OPENAI_API_KEY,
-            temperature=0.7,
-            streaming=True
-        )
-        
         self.system_prompt = """You are an advanced AI assistant designed for a professional, production-grade conversational application. Your primary responsibility is to provide accurate, context-aware, structured, and helpful responses while strictly respecting session boundaries and conversation isolation.
 
 Core Principles:
@@ -57,6 +51,19 @@ Examples of WRONG formatting (DO NOT USE):
 
 Your responses are streamed token-by-token, so structure answers with core information first, followed by details."""
     
+    @cached_property
+    def llm(self):
+        # langchain is imported on first use to keep importing the module cheap;
+        # lifespan warms it up off the event loop before serving
+        from langchain_openai import ChatOpenAI
+        return ChatOpenAI(
+            model=settings.OPENAI_MODEL,
+            openai_api_key=settings.OPENAI_API_KEY,
+            base_url=settings.OPENAI_BASE_URL,
+            temperature=0.7,
+            streaming=True
+        )
+    
     async def generate_response(
         self,
         query: str,
@@ -64,6 +71,10 @@ Your responses are streamed token-by-token, so structure answers with core infor
         chat_history: List[Dict],
         use_rag: bool = True
     ) -> AsyncGenerator[str, None]:
+        from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
+        
+        started = time.perf_counter()
+        rag_label = "true" if use_rag else "false"
         
         context_docs = []
         if use_rag:
@@ -80,7 +91,7 @@ Your responses are streamed token-by-token, so structure answers with core infor
         user_message_content = query
         if context_docs:
             context_text = "\n\n".join([
-                f"Document: {doc['metadata'].get('filename', 'Unknown')}\n{doc['content']}"
+                f"Document: {self._describe_source(doc['metadata'])}\n{doc['content']}"
                 for doc in context_docs
             ])
             user_message_content = f"""Based on the following context from uploaded files:
@@ -91,11 +102,28 @@ User Question: {query}"""
         
         messages.append(HumanMessage(content=user_message_content))
         
+        first_token = True
         async for chunk in self.llm.astream(messages):
             if chunk.content:
+                if first_token:
+                    TIME_TO_FIRST_TOKEN.labels(rag_label).observe(time.perf_counter() - started)
+                    first_token = False
                 yield chunk.content
+        
+        GENERATION_SECONDS.labels(rag_label).observe(time.perf_counter() - started)
+    
+    @staticmethod
+    def _describe_source(metadata: Dict) -> str:
+        source = metadata.get('filename', 'Unknown')
+        if metadata.get('page') is not None:
+            source += f", page {metadata['page']}"
+        if metadata.get('heading'):
+            source += f", section \"{metadata['heading']}\""
+        return source
     
     async def generate_chat_title(self, first_message: str) -> str:
+        from langchain_core.messages import HumanMessage
+        
         prompt = f"Generate a concise 3-5 word title for a chat that starts with: '{first_message[:100]}'. Return only the title, no quotes or extra text."
         
         messages = [HumanMessage(content=prompt)]
@@ -1,25 +1,37 @@
-from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, WebSocket, WebSocketDisconnect, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
 from bson import ObjectId
 from datetime import datetime
 import json
+import logging
 
 from app.auth import get_current_user
 from app.database import get_db
 from app.websocket_manager import manager
 from app.rag_engine import rag_engine
+from app.admission import AdmissionRejected, admission_controller
+from app.write_buffer import write_buffer
 from app.vector_store import vector_store
+from app.maintenance import purge_session_data
+from app.routes.file_routes import get_file_summary
 from jose import jwt, JWTError
 from app.config import settings
+from app.metrics import TurnTrace, GENERATION_CHUNKS
+from app.pagination import NEXT_CURSOR_HEADER, encode_cursor, keyset_filter, parse_since
 
 router = APIRouter(prefix="/api/chat", tags=["Chat"])
 
+logger = logging.getLogger(__name__)
+
 
 @router.post("/sessions")
 async def create_session(current_user = Depends(get_current_user), db = Depends(get_db)):
     session = {
         "user_id": str(current_user["_id"]),
         "title": "New Chat",
+        "file_count": 0,
+        "filenames": [],
         "created_at": datetime.utcnow(),
         "updated_at": datetime.utcnow()
     }
@@ -30,11 +42,58 @@ async def create_session(current_user = Depends(get_current_user), db = Depends(
     return {"session_id": str(result.inserted_id), "title": session["title"]}
 
 
+SESSION_PROJECTION = {"title": 1, "created_at": 1, "updated_at": 1}
+MESSAGE_PROJECTION = {"role": 1, "content": 1, "timestamp": 1, "file_references": 1}
+EXPORT_BATCH_SIZE = 500
+HISTORY_WINDOW = 10
+
+
+def serialize_message(msg: dict) -> dict:
+    return {
+        "id": str(msg["_id"]),
+        "role": msg["role"],
+        "content": msg["content"],
+        "timestamp": msg["timestamp"].isoformat(),
+        "file_references": msg.get("file_references", [])
+    }
+
+
+async def get_owned_session(session_id: str, user, db, projection: Optional[dict] = None) -> dict:
+    session = await db.chat_sessions.find_one(
+        {"_id": ObjectId(session_id)},
+        {"user_id": 1, **(projection or {})}
+    )
+    if not session or session["user_id"] != str(user["_id"]):
+        raise HTTPException(status_code=404, detail="Session not found")
+    return session
+
+
 @router.get("/sessions")
-async def get_sessions(current_user = Depends(get_current_user), db = Depends(get_db)):
-    sessions = await db.chat_sessions.find(
-        {"user_id": str(current_user["_id"])}
-    ).sort("updated_at", -1).to_list(100)
+async def get_sessions(
+    response: Response,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page"),
+    since: Optional[str] = Query(None, description="Only sessions updated after this ISO timestamp"),
+    current_user = Depends(get_current_user),
+    db = Depends(get_db)
+):
+    """
+    Lists the user's sessions, most recently updated first. When more
+    sessions exist, the cursor for the next page is returned in X-Next-Cursor.
+    """
+    query = {"user_id": str(current_user["_id"])}
+    since_dt = parse_since(since)
+    if since_dt:
+        query["updated_at"] = {"$gt": since_dt}
+    query.update(keyset_filter("updated_at", cursor, descending=True))
+    
+    sessions = await db.chat_sessions.find(query, SESSION_PROJECTION).sort(
+        [("updated_at", -1), ("_id", -1)]
+    ).limit(limit + 1).to_list(limit + 1)
+    
+    if len(sessions) > limit:
+        sessions = sessions[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(sessions[-1]["updated_at"], sessions[-1]["_id"])
     
     return [{
         "id": str(session["_id"]),
@@ -47,39 +106,99 @@ async def get_sessions(current_user = Depends(get_current_user), db = Depends(ge
 @router.get("/sessions/{session_id}/messages")
 async def get_messages(
     session_id: str,
+    response: Response,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page"),
+    since: Optional[str] = Query(None, description="Only messages after this ISO timestamp"),
     current_user = Depends(get_current_user),
     db = Depends(get_db)
 ):
-    session = await db.chat_sessions.find_one({"_id": ObjectId(session_id)})
-    if not session or session["user_id"] != str(current_user["_id"]):
-        raise HTTPException(status_code=404, detail="Session not found")
+    """
+    Returns a page of messages in chronological order.
+
+    Without ``since`` this is the most recent page and X-Next-Cursor points
+    at older history. With ``since`` it returns the messages that follow
+    the given timestamp, for incremental sync; X-Next-Cursor then marks the
+    last returned message, and passing it back resumes right after it
+    (also on a later sync), so messages sharing a timestamp are not skipped.
+    """
+    await get_owned_session(session_id, current_user, db)
     
-    messages = await db.messages.find(
-        {"session_id": session_id}
-    ).sort("timestamp", 1).to_list(1000)
+    if since is not None:
+        query = {
+            "session_id": session_id,
+            "timestamp": {"$gt": parse_since(since)},
+            **keyset_filter("timestamp", cursor, descending=False)
+        }
+        messages = await db.messages.find(query, MESSAGE_PROJECTION).sort(
+            [("timestamp", 1), ("_id", 1)]
+        ).limit(limit).to_list(limit)
+        if messages:
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor(messages[-1]["timestamp"], messages[-1]["_id"])
+        elif cursor:
+            response.headers[NEXT_CURSOR_HEADER] = cursor
+        return [serialize_message(msg) for msg in messages]
     
-    return [{
-        "id": str(msg["_id"]),
-        "role": msg["role"],
-        "content": msg["content"],
-        "timestamp": msg["timestamp"].isoformat(),
-        "file_references": msg.get("file_references", [])
-    } for msg in messages]
+    query = {"session_id": session_id, **keyset_filter("timestamp", cursor, descending=True)}
+    messages = await db.messages.find(query, MESSAGE_PROJECTION).sort(
+        [("timestamp", -1), ("_id", -1)]
+    ).limit(limit + 1).to_list(limit + 1)
+    
+    if len(messages) > limit:
+        messages = messages[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(messages[-1]["timestamp"], messages[-1]["_id"])
+    
+    return [serialize_message(msg) for msg in reversed(messages)]
+
+
+@router.get("/sessions/{session_id}/messages/export")
+async def export_messages(
+    session_id: str,
+    current_user = Depends(get_current_user),
+    db = Depends(get_db)
+):
+    """Streams the full message history as a JSON array without buffering it in memory."""
+    await get_owned_session(session_id, current_user, db)
+    
+    async def stream():
+        yield "["
+        first = True
+        cursor = db.messages.find({"session_id": session_id}, MESSAGE_PROJECTION).sort(
+            [("timestamp", 1), ("_id", 1)]
+        ).batch_size(EXPORT_BATCH_SIZE)
+        async for msg in cursor:
+            yield ("" if first else ",") + json.dumps(serialize_message(msg))
+            first = False
+        yield "]"
+    
+    return StreamingResponse(
+        stream(),
+        media_type="application/json",
+        headers={"Content-Disposition": f'attachment; filename="chat-{session_id}.json"'}
+    )
 
 
 @router.delete("/sessions/{session_id}")
 async def delete_session(
     session_id: str,
+    background_tasks: BackgroundTasks,
     current_user = Depends(get_current_user),
     db = Depends(get_db)
 ):
-    session = await db.chat_sessions.find_one({"_id": ObjectId(session_id)})
-    if not session or session["user_id"] != str(current_user["_id"]):
-        raise HTTPException(status_code=404, detail="Session not found")
+    """
+    Deletes the session document immediately and evicts its index from
+    memory; messages, files, blobs and on-disk index files are purged in
+    the background. Anything left behind by an interrupted purge, or
+    written afterwards by a socket still open on the session, is
+    reclaimed by the periodic garbage collection (collect_garbage).
+    """
+    await get_owned_session(session_id, current_user, db)
     
+    content_hashes = await db.files.distinct("content_hash", {"session_id": session_id})
     await db.chat_sessions.delete_one({"_id": ObjectId(session_id)})
-    await db.messages.delete_many({"session_id": session_id})
-    await db.files.delete_many({"session_id": session_id})
+    vector_store.evict(session_id)
+    
+    background_tasks.add_task(purge_session_data, db, session_id, content_hashes)
     
     return {"message": "Session deleted successfully"}
 
@@ -125,17 +244,30 @@ async def websocket_endpoint(
         session = await db.chat_sessions.find_one({"_id": ObjectId(session_id)})
         if not session or session["user_id"] != str(user["_id"]):
             await websocket.close(code=1008, reason="Unauthorized")
+            manager.disconnect(websocket, session_id)
             return
         
-        vector_store.load_index(session_id)
+        await vector_store.ensure_loaded(session_id)
         
         while True:
             data = await websocket.receive_text()
             message_data = json.loads(data)
             
             user_message = message_data.get("content")
+            trace = TurnTrace(session_id, str(user["_id"]))
+            
+            # Get the most recent chat history, newest first, once earlier buffered writes have landed
+            await write_buffer.wait_for_session(session_id)
+            chat_history = await db.messages.find(
+                {"session_id": session_id},
+                {"role": 1, "content": 1}
+            ).sort([("timestamp", -1), ("_id", -1)]).limit(HISTORY_WINDOW).to_list(HISTORY_WINDOW)
+            
+            history_list = [{
+                "role": msg["role"],
+                "content": msg["content"]
+            } for msg in reversed(chat_history)]
             
-            # Save user message
             user_msg = {
                 "session_id": session_id,
                 "role": "user",
@@ -143,67 +275,91 @@ async def websocket_endpoint(
                 "timestamp": datetime.utcnow(),
                 "file_references": []
             }
-            await db.messages.insert_one(user_msg)
             
-            # Get chat history (excluding the just-added user message for context)
-            chat_history = await db.messages.find(
-                {"session_id": session_id}
-            ).sort("timestamp", 1).to_list(100)
+            file_summary = await get_file_summary(db, session_id)
+            use_rag = file_summary["file_count"] > 0
+            trace.mark("context_loaded")
             
-            # Prepare history for RAG (exclude the last message which is the current user query)
-            history_list = [{
-                "role": msg["role"],
-                "content": msg["content"]
-            } for msg in chat_history[:-1]]
-            
-            files = await db.files.find({"session_id": session_id}).to_list(100)
-            use_rag = len(files) > 0
+            async def send_queue_position(position: int):
+                await manager.send_message(json.dumps({
+                    "type": "queued",
+                    "position": position
+                }), session_id)
             
-            # Stream response
+            # Stream response once a generation slot is free
             assistant_content = ""
-            async for chunk in rag_engine.generate_response(
-                user_message,
-                session_id,
-                history_list,
-                use_rag
-            ):
-                assistant_content += chunk
+            try:
+                async with admission_controller.slot(str(user["_id"]), on_position=send_queue_position):
+                    trace.mark("admitted")
+                    # Save user message only once admitted, so shed turns leave no unanswered
+                    # message behind (write-behind, flushed with the next batch)
+                    write_buffer.insert_message(user_msg)
+                    trace.mark("user_message_buffered")
+                    async for chunk in rag_engine.generate_response(
+                        user_message,
+                        session_id,
+                        history_list,
+                        use_rag
+                    ):
+                        if not assistant_content:
+                            trace.mark("first_token")
+                        assistant_content += chunk
+                        GENERATION_CHUNKS.inc()
+                        await manager.send_message(json.dumps({
+                            "type": "chunk",
+                            "content": chunk
+                        }), session_id)
+                    
+                    # Save assistant message ONCE after streaming is complete
+                    assistant_msg = {
+                        "session_id": session_id,
+                        "role": "assistant",
+                        "content": assistant_content,
+                        "timestamp": datetime.utcnow(),
+                        "file_references": file_summary["filenames"]
+                    }
+                    # Clients reload messages on "end", so wait for the batch holding this one
+                    await write_buffer.insert_message(assistant_msg)
+                    trace.mark("assistant_message_saved")
+                    
+                    # Send end signal
+                    await manager.send_message(json.dumps({
+                        "type": "end"
+                    }), session_id)
+                    
+                    # Titling the first exchange is another upstream call, so it runs
+                    # under the slot already held rather than unadmitted
+                    title = None
+                    if not chat_history:
+                        title = await rag_engine.generate_chat_title(user_message)
+            except AdmissionRejected as e:
                 await manager.send_message(json.dumps({
-                    "type": "chunk",
-                    "content": chunk
+                    "type": "error",
+                    "content": "The server is busy right now. Please try again in a moment.",
+                    "retry_after": round(e.estimated_wait)
                 }), session_id)
-            
-            # Save assistant message ONCE after streaming is complete
-            assistant_msg = {
-                "session_id": session_id,
-                "role": "assistant",
-                "content": assistant_content,
-                "timestamp": datetime.utcnow(),
-                "file_references": [f["filename"] for f in files]
-            }
-            await db.messages.insert_one(assistant_msg)
-            
-            # Send end signal
-            await manager.send_message(json.dumps({
-                "type": "end"
-            }), session_id)
+                await manager.send_message(json.dumps({
+                    "type": "end"
+                }), session_id)
+                trace.emit(use_rag=use_rag, history_messages=len(history_list), shed=True)
+                continue
             
             # Update chat title if this is the first exchange
-            message_count = await db.messages.count_documents({"session_id": session_id})
-            if message_count == 2:
-                title = await rag_engine.generate_chat_title(user_message)
+            if title:
                 await db.chat_sessions.update_one(
                     {"_id": ObjectId(session_id)},
-                    {"$set": {"title": title, "updated_at": datetime.utcnow()}}
-                )
-            else:
-                await db.chat_sessions.update_one(
-                    {"_id": ObjectId(session_id)},
-                    {"$set": {"updated_at": datetime.utcnow()}}
+                    {"$set": {"title": title}}
                 )
+            write_buffer.touch_session(session_id)
+            
+            trace.emit(
+                use_rag=use_rag,
+                history_messages=len(history_list),
+                response_chars=len(assistant_content),
+            )
     
     except WebSocketDisconnect:
         manager.disconnect(websocket, session_id)
-    except Exception as e:
-        print(f"WebSocket error: {e}")
+    except Exception:
+        logger.exception("WebSocket error in session %s", session_id)
         manager.disconnect(websocket, session_id)
\ No newline at end of file
@@ -1,38 +1,175 @@
 from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
-from typing import List
-import pypdf
-import docx
+from typing import Dict, List, Optional, Tuple
+import asyncio
 import io
+import mimetypes
+import os
+import zipfile
 from bson import ObjectId
 from datetime import datetime
 
 from app.auth import get_current_user
+from app.config import settings
 from app.database import get_db
 from app.vector_store import vector_store
+from app.blob_store import blob_store
+from app.chunking import Block, blocks_to_text
+from app.extraction import SUPPORTED_EXTENSIONS, extract_blocks
+from app.metrics import UPLOAD_STAGE_SECONDS
 
 router = APIRouter(prefix="/api/files", tags=["Files"])
 
+FILE_LIST_PROJECTION = {
+    "filename": 1,
+    "file_type": 1,
+    "file_size": 1,
+    "uploaded_at": 1,
+    "vectorized": 1,
+}
 
-async def extract_text_from_file(file: UploadFile) -> str:
+
+async def get_file_summary(db, session_id: str, session: Optional[dict] = None) -> dict:
+    """
+    Returns the ``file_count``/``filenames`` summary kept on the session,
+    backfilling it from ``db.files`` for sessions created before it existed.
+    """
+    if session is None or "file_count" not in session:
+        session = await db.chat_sessions.find_one(
+            {"_id": ObjectId(session_id)}, {"file_count": 1, "filenames": 1}
+        )
+    if session and "file_count" in session:
+        return {"file_count": session["file_count"], "filenames": session.get("filenames", [])}
+
+    files = await db.files.find({"session_id": session_id}, {"filename": 1}).to_list(None)
+    summary = {"file_count": len(files), "filenames": [f["filename"] for f in files]}
+    await db.chat_sessions.update_one(
+        {"_id": ObjectId(session_id), "file_count": {"$exists": False}},
+        {"$set": summary},
+    )
+    return summary
+
+
+async def extract_blocks_from_file(file: UploadFile) -> List[Block]:
     content = await file.read()
+    return extract_blocks(file.filename, content)
+
+
+async def ingest_documents(db, session_id: str, session: dict, documents: List[Dict]) -> List[str]:
+    """
+    Stores and vectorizes already-extracted documents in one pass: blobs are
+    written concurrently, file documents go in with a single insert_many,
+    all chunks are embedded together and the index is saved once.
+
+    Each document is a dict with ``filename``, ``file_type`` and ``blocks``.
+    Returns the inserted file ids in order.
+    """
+    texts = [blocks_to_text(doc["blocks"]) for doc in documents]
+    with UPLOAD_STAGE_SECONDS.labels("blob").time():
+        content_hashes = await asyncio.gather(*[blob_store.put(text) for text in texts])
+    await get_file_summary(db, session_id, session)
+
+    now = datetime.utcnow()
+    file_docs = [
+        {
+            "session_id": session_id,
+            "filename": doc["filename"],
+            "file_type": doc["file_type"],
+            "file_size": len(text),
+            "content_hash": content_hash,
+            "vectorized": False,
+            "uploaded_at": now,
+        }
+        for doc, text, content_hash in zip(documents, texts, content_hashes)
+    ]
+
+    with UPLOAD_STAGE_SECONDS.labels("store").time():
+        result = await db.files.insert_many(file_docs, ordered=False)
+    file_ids = result.inserted_ids
+
+    with UPLOAD_STAGE_SECONDS.labels("vectorize").time():
+        await vector_store.add_blocks(
+            session_id,
+            [doc["blocks"] for doc in documents],
+            [{"filename": doc["filename"], "file_id": str(file_id)} for doc, file_id in zip(documents, file_ids)],
+        )
+
+    with UPLOAD_STAGE_SECONDS.labels("finalize").time():
+        await db.files.update_many(
+            {"_id": {"$in": file_ids}}, {"$set": {"vectorized": True}}
+        )
+        await db.chat_sessions.update_one(
+            {"_id": ObjectId(session_id)},
+            {
+                "$inc": {"file_count": len(documents)},
+                "$push": {"filenames": {"$each": [doc["filename"] for doc in documents]}},
+            },
+        )
+
+    return [str(file_id) for file_id in file_ids]
+
+
+def expand_uploads(uploads: List[Tuple[str, bytes]]) -> Tuple[List[Tuple[str, bytes]], List[Dict]]:
+    """
+    Flattens zip archives into their supported members, enforcing the bulk
+    upload file-count and size limits. Returns (files, errors).
+    """
+    files, errors = [], []
+    total_bytes = 0
+
+    def accept(name: str, size: int) -> bool:
+        nonlocal total_bytes
+        if len(files) >= settings.BULK_UPLOAD_MAX_FILES:
+            errors.append({"filename": name, "error": "Too many files in upload"})
+            return False
+        if total_bytes + size > settings.BULK_UPLOAD_MAX_BYTES:
+            errors.append({"filename": name, "error": "Upload size limit exceeded"})
+            return False
+        total_bytes += size
+        return True
+
+    for name, content in uploads:
+        if not name.lower().endswith(".zip"):
+            if accept(name, len(content)):
+                files.append((name, content))
+            continue
+        try:
+            with zipfile.ZipFile(io.BytesIO(content)) as archive:
+                for member in archive.infolist():
+                    member_name = os.path.basename(member.filename)
+                    if member.is_dir() or member_name.startswith(".") or member.filename.startswith("__MACOSX/"):
+                        continue
+                    if not member_name.lower().endswith(SUPPORTED_EXTENSIONS):
+                        errors.append({"filename": member.filename, "error": "Unsupported file type"})
+                        continue
+                    # file_size is the declared uncompressed size, checked before inflating
+                    if accept(member.filename, member.file_size):
+                        files.append((member_name, archive.read(member)))
+        except zipfile.BadZipFile:
+            errors.append({"filename": name, "error": "Invalid zip archive"})
 
-    if file.filename.endswith(".pdf"):
-        pdf_reader = pypdf.PdfReader(io.BytesIO(content))
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text()
-        return text
+    return files, errors
 
-    elif file.filename.endswith(".docx"):
-        doc = docx.Document(io.BytesIO(content))
-        text = "\n".join([paragraph.text for paragraph in doc.paragraphs])
-        return text
 
-    elif file.filename.endswith(".txt"):
-        return content.decode("utf-8")
+async def read_uploads(files: List[UploadFile]) -> List[Tuple[str, bytes]]:
+    """
+    Reads the raw uploads, rejecting the request with 413 as soon as their
+    total size exceeds BULK_UPLOAD_MAX_BYTES, before anything is buffered.
+    """
+    limit = settings.BULK_UPLOAD_MAX_BYTES
+    too_large = HTTPException(status_code=413, detail="Upload size limit exceeded")
+    if sum(f.size or 0 for f in files) > limit:
+        raise too_large
 
-    else:
-        raise HTTPException(status_code=400, detail="Unsupported file type")
+    uploads = []
+    total_bytes = 0
+    for f in files:
+        # Sizes may be unknown, so never read more than the remaining budget
+        content = await f.read(limit - total_bytes + 1)
+        total_bytes += len(content)
+        if total_bytes > limit:
+            raise too_large
+        uploads.append((f.filename, content))
+    return uploads
 
 
 @router.post("/upload/{session_id}")
@@ -47,36 +184,71 @@ async def upload_file(
         raise HTTPException(status_code=404, detail="Session not found")
 
     try:
-        text_content = await extract_text_from_file(file)
+        with UPLOAD_STAGE_SECONDS.labels("extract").time():
+            blocks = await extract_blocks_from_file(file)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Failed to process file: {str(e)}")
 
-    file_doc = {
-        "session_id": session_id,
+    file_ids = await ingest_documents(db, session_id, session, [
+        {"filename": file.filename, "file_type": file.content_type, "blocks": blocks}
+    ])
+
+    return {
+        "file_id": file_ids[0],
         "filename": file.filename,
-        "file_type": file.content_type,
-        "file_size": len(text_content),
-        "content_text": text_content,
-        "vectorized": False,
-        "uploaded_at": datetime.utcnow(),  # Added this line
+        "message": "File uploaded and vectorized successfully",
     }
 
-    result = await db.files.insert_one(file_doc)
 
-    await vector_store.add_documents(
-        session_id,
-        [text_content],
-        [{"filename": file.filename, "file_id": str(result.inserted_id)}],
-    )
+@router.post("/upload/{session_id}/bulk")
+async def upload_files_bulk(
+    session_id: str,
+    files: List[UploadFile] = File(...),
+    current_user=Depends(get_current_user),
+    db=Depends(get_db),
+):
+    """
+    Uploads many files at once; zip archives are expanded. Files are
+    extracted in parallel and ingested together, so the FAISS index is
+    written once per request. Files that fail are reported individually.
+    """
+    session = await db.chat_sessions.find_one({"_id": ObjectId(session_id)})
+    if not session or session["user_id"] != str(current_user["_id"]):
+        raise HTTPException(status_code=404, detail="Session not found")
 
-    await db.files.update_one(
-        {"_id": result.inserted_id}, {"$set": {"vectorized": True}}
-    )
+    uploads = await read_uploads(files)
+    expanded, errors = await asyncio.to_thread(expand_uploads, uploads)
+
+    semaphore = asyncio.Semaphore(settings.EXTRACTION_CONCURRENCY)
+
+    async def extract(name: str, content: bytes):
+        async with semaphore:
+            try:
+                return await asyncio.to_thread(extract_blocks, name, content)
+            except Exception as e:
+                errors.append({"filename": name, "error": f"Failed to process file: {str(e)}"})
+                return None
+
+    with UPLOAD_STAGE_SECONDS.labels("extract").time():
+        extracted = await asyncio.gather(*[extract(name, content) for name, content in expanded])
+
+    documents = [
+        {"filename": name, "file_type": mimetypes.guess_type(name)[0], "blocks": blocks}
+        for (name, _), blocks in zip(expanded, extracted)
+        if blocks is not None
+    ]
+    if not documents:
+        raise HTTPException(status_code=400, detail={"message": "No files could be processed", "errors": errors})
+
+    file_ids = await ingest_documents(db, session_id, session, documents)
 
     return {
-        "file_id": str(result.inserted_id),
-        "filename": file.filename,
-        "message": "File uploaded and vectorized successfully",
+        "uploaded": [
+            {"file_id": file_id, "filename": doc["filename"]}
+            for file_id, doc in zip(file_ids, documents)
+        ],
+        "errors": errors,
+        "message": f"{len(documents)} file(s) uploaded and vectorized successfully",
     }
 
 
@@ -88,7 +260,7 @@ async def get_files(
     if not session or session["user_id"] != str(current_user["_id"]):
         raise HTTPException(status_code=404, detail="Session not found")
 
-    files = await db.files.find({"session_id": session_id}).to_list(100)
+    files = await db.files.find({"session_id": session_id}, FILE_LIST_PROJECTION).to_list(100)
     return [
         {
             "id": str(f["_id"]),
@@ -0,0 +1,99 @@
+import logging
+import time
+from typing import Dict, Optional
+
+from app.config import settings
+from app.metrics import STARTUP_SECONDS
+from app.rag_engine import rag_engine
+from app.vector_store import vector_store
+
+logger = logging.getLogger(__name__)
+
+
+class StartupState:
+    """Tracks startup progress for the /ready endpoint."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.startup_seconds: Optional[float] = None
+        self.warm_up_seconds: Optional[float] = None
+        self.preload_done = not settings.PRELOAD_INDEXES
+        self.preload_seconds: Optional[float] = None
+        self.preloaded_sessions = 0
+        self.preloaded_bytes = 0
+
+    def mark_started(self):
+        self.startup_seconds = round(time.perf_counter() - self.started, 3)
+        STARTUP_SECONDS.set(self.startup_seconds)
+
+    @property
+    def ready(self) -> bool:
+        return self.startup_seconds is not None and self.preload_done
+
+    def report(self) -> Dict:
+        return {
+            "status": "ready" if self.ready else "starting",
+            "startup_seconds": self.startup_seconds,
+            "warm_up_seconds": self.warm_up_seconds,
+            "preload": {
+                "enabled": settings.PRELOAD_INDEXES,
+                "done": self.preload_done,
+                "seconds": self.preload_seconds,
+                "sessions": self.preloaded_sessions,
+                "bytes": self.preloaded_bytes,
+            },
+        }
+
+
+startup_state = StartupState()
+
+
+def warm_up():
+    """
+    Imports faiss, numpy and langchain and builds the embedding, chat and
+    tokenizer clients, so the first upload or chat turn doesn't pay for
+    them while holding up the event loop.
+    """
+    started = time.perf_counter()
+    vector_store.warm_up()
+    rag_engine.llm
+    startup_state.warm_up_seconds = round(time.perf_counter() - started, 3)
+    logger.info("Warmed up dependencies in %.2fs", startup_state.warm_up_seconds)
+
+
+async def preload_indexes(db):
+    """
+    Loads the indexes of the most recently updated sessions that have files,
+    newest first, until PRELOAD_MAX_SESSIONS or PRELOAD_MEMORY_BUDGET_MB is
+    reached. On-disk size is used as the memory estimate before loading.
+    """
+    started = time.perf_counter()
+    budget = settings.PRELOAD_MEMORY_BUDGET_MB * 1024 * 1024
+    try:
+        cursor = db.chat_sessions.find(
+            {"file_count": {"$ne": 0}}, {"_id": 1}
+        ).sort("updated_at", -1).limit(settings.PRELOAD_MAX_SESSIONS)
+
+        async for session in cursor:
+            session_id = str(session["_id"])
+            if session_id in vector_store.indexes:
+                continue
+            estimate = vector_store.persisted_bytes(session_id)
+            if not estimate:
+                continue
+            if vector_store.memory_bytes() + estimate > budget:
+                break
+            if await vector_store.ensure_loaded(session_id):
+                startup_state.preloaded_sessions += 1
+                startup_state.preloaded_bytes += vector_store.memory_bytes(session_id)
+    except Exception:
+        logger.exception("Index preload failed")
+    finally:
+        startup_state.preload_seconds = round(time.perf_counter() - started, 3)
+        startup_state.preload_done = True
+        logger.info(
+            "Preloaded %d session indexes (%d bytes) in %.2fs",
+            startup_state.preloaded_sessions,
+            startup_state.preloaded_bytes,
+            startup_state.preload_seconds,
+        )
@@ -1,63 +1,148 @@
+import asyncio
 import os
 import pickle
-from typing import List, Dict
-import faiss
-import numpy as np
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings
+import time
+from functools import cached_property
+from typing import Any, List, Dict, Optional, Set, Tuple
 from app.config import settings
+from app.chunking import Block, Chunk, TokenChunker, Tokenizer, blocks_from_text, blocks_to_text, chunk_hash
+from app.metrics import (
+    EMBEDDING_SECONDS,
+    FAISS_SEARCH_SECONDS,
+    LOADED_INDEXES,
+    LOADED_INDEX_BYTES,
+)
 
 
 class VectorStore:
+    """
+    Per-session FAISS indexes. faiss, numpy and the langchain clients are
+    imported on first use so importing the app stays cheap.
+    """
+    
     def __init__(self):
-        self.embeddings = OpenAIEmbeddings(
+        self.chunker = TokenChunker(
+            Tokenizer(settings.TOKENIZER_ENCODING),
+            max_tokens=settings.CHUNK_TOKENS,
+            overlap_tokens=settings.CHUNK_OVERLAP_TOKENS
+        )
+        self.indexes: Dict[str, Any] = {}
+        self.documents: Dict[str, List[Dict]] = {}
+        self.chunk_hashes: Dict[str, Set[str]] = {}
+        self._memory: Dict[str, int] = {}
+        self._loaded_mtimes: Dict[str, float] = {}
+        
+        os.makedirs(settings.FAISS_INDEX_PATH, exist_ok=True)
+    
+    @cached_property
+    def embeddings(self):
+        from langchain_openai import OpenAIEmbeddings
+        return OpenAIEmbeddings(
             model=settings.EMBEDDING_MODEL,
-            openai_api_key=settings.OPENAI_API_KEY
+            openai_api_key=settings.OPENAI_API_KEY,
+            base_url=settings.OPENAI_BASE_URL,
+            check_embedding_ctx_length=settings.EMBEDDING_CHECK_CTX_LENGTH
         )
-        self.text_splitter = RecursiveCharacterTextSplitter(
+    
+    @cached_property
+    def text_splitter(self):
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+        return RecursiveCharacterTextSplitter(
             chunk_size=settings.CHUNK_SIZE,
             chunk_overlap=settings.CHUNK_OVERLAP
         )
-        self.indexes: Dict[str, faiss.IndexFlatL2] = {}
-        self.documents: Dict[str, List[Dict]] = {}
-        
-        os.makedirs(settings.FAISS_INDEX_PATH, exist_ok=True)
     
-    async def add_documents(self, session_id: str, texts: List[str], metadatas: List[Dict]):
+    def warm_up(self):
+        """Does the deferred imports and builds the clients; blocking, so run it in a thread."""
+        import faiss  # noqa: F401
+        import numpy  # noqa: F401
+        self.embeddings
+        self.chunker.tokenizer.count("")
+        if settings.CHUNKER == "character":
+            self.text_splitter
+    
+    def split(self, blocks: List[Block]) -> List[Chunk]:
+        if settings.CHUNKER == "character":
+            return [Chunk(text=text) for text in self.text_splitter.split_text(blocks_to_text(blocks))]
+        return self.chunker.chunk(blocks)
+    
+    def _new_chunks(self, documents: List[List[Block]], metadatas: List[Dict], known: Set[str]):
+        """Chunks documents and drops chunks whose hash is in ``known`` or repeated."""
         chunks = []
         chunk_metadatas = []
+        hashes = []
+        seen = set()
+        
+        for blocks, metadata in zip(documents, metadatas):
+            for chunk in self.split(blocks):
+                digest = chunk_hash(chunk.text)
+                if digest in known or digest in seen:
+                    continue
+                seen.add(digest)
+                chunks.append(chunk.text)
+                chunk_metadatas.append({**metadata, **chunk.metadata})
+                hashes.append(digest)
+        return chunks, chunk_metadatas, hashes
+    
+    async def add_documents(self, session_id: str, texts: List[str], metadatas: List[Dict]) -> int:
+        return await self.add_blocks(session_id, [blocks_from_text(text) for text in texts], metadatas)
+    
+    async def add_blocks(self, session_id: str, documents: List[List[Block]], metadatas: List[Dict]) -> int:
+        """
+        Chunks structured documents, skips chunks already indexed for the
+        session, embeds the rest and persists the index. Returns the number
+        of chunks added.
+        """
+        import faiss
+        import numpy as np
         
-        for text, metadata in zip(texts, metadatas):
-            text_chunks = self.text_splitter.split_text(text)
-            chunks.extend(text_chunks)
-            chunk_metadatas.extend([metadata] * len(text_chunks))
+        await self.ensure_loaded(session_id)
         
-        embeddings = await self.embeddings.aembed_documents(chunks)
+        # Tokenizing a bulk upload can take seconds, so chunk off the event loop
+        chunks, chunk_metadatas, hashes = await asyncio.to_thread(
+            self._new_chunks, documents, metadatas, self.chunk_hashes.get(session_id, set())
+        )
+        
+        if not chunks:
+            return 0
+        
+        with EMBEDDING_SECONDS.labels("documents").time():
+            embeddings = await self.embeddings.aembed_documents(chunks)
         embeddings_np = np.array(embeddings).astype('float32')
         
         if session_id not in self.indexes:
             dimension = embeddings_np.shape[1]
             self.indexes[session_id] = faiss.IndexFlatL2(dimension)
             self.documents[session_id] = []
+            self.chunk_hashes[session_id] = set()
         
         self.indexes[session_id].add(embeddings_np)
         
-        for chunk, metadata in zip(chunks, chunk_metadatas):
+        for chunk, metadata, digest in zip(chunks, chunk_metadatas, hashes):
             self.documents[session_id].append({
                 "content": chunk,
-                "metadata": metadata
+                "metadata": metadata,
+                "hash": digest
             })
+        self.chunk_hashes[session_id].update(hashes)
         
         self._save_index(session_id)
+        self._track(session_id)
+        return len(chunks)
     
     async def similarity_search(self, session_id: str, query: str, k: int = 4) -> List[Dict]:
+        import numpy as np
+        
         if session_id not in self.indexes:
             return []
         
-        query_embedding = await self.embeddings.aembed_query(query)
+        with EMBEDDING_SECONDS.labels("query").time():
+            query_embedding = await self.embeddings.aembed_query(query)
         query_embedding_np = np.array([query_embedding]).astype('float32')
         
+        search_started = time.perf_counter()
         distances, indices = self.indexes[session_id].search(query_embedding_np, k)
+        FAISS_SEARCH_SECONDS.observe(time.perf_counter() - search_started)
         
         results = []
         for idx in indices[0]:
@@ -66,27 +151,143 @@ class VectorStore:
         
         return results
     
-    def _save_index(self, session_id: str):
+    def _paths(self, session_id: str) -> Tuple[str, str]:
         index_path = os.path.join(settings.FAISS_INDEX_PATH, f"{session_id}.index")
         docs_path = os.path.join(settings.FAISS_INDEX_PATH, f"{session_id}.pkl")
+        return index_path, docs_path
+    
+    def _save_index(self, session_id: str):
+        import faiss
+        
+        index_path, docs_path = self._paths(session_id)
         
         faiss.write_index(self.indexes[session_id], index_path)
         
         with open(docs_path, 'wb') as f:
             pickle.dump(self.documents[session_id], f)
+        self._loaded_mtimes[session_id] = self._persisted_mtime(session_id)
     
-    def load_index(self, session_id: str):
-        index_path = os.path.join(settings.FAISS_INDEX_PATH, f"{session_id}.index")
-        docs_path = os.path.join(settings.FAISS_INDEX_PATH, f"{session_id}.pkl")
+    def _persisted_mtime(self, session_id: str) -> Optional[float]:
+        index_path, docs_path = self._paths(session_id)
+        try:
+            return max(os.path.getmtime(index_path), os.path.getmtime(docs_path))
+        except FileNotFoundError:
+            return None
+    
+    def _read_index(self, session_id: str) -> Optional[Tuple[Any, List[Dict], Set[str], float]]:
+        """Reads a persisted index from disk without touching resident state."""
+        import faiss
+        
+        index_path, docs_path = self._paths(session_id)
+        mtime = self._persisted_mtime(session_id)
+        if mtime is None:
+            return None
         
-        if os.path.exists(index_path) and os.path.exists(docs_path):
-            self.indexes[session_id] = faiss.read_index(index_path)
-            
-            with open(docs_path, 'rb') as f:
-                self.documents[session_id] = pickle.load(f)
-            
+        index = faiss.read_index(index_path)
+        with open(docs_path, 'rb') as f:
+            documents = pickle.load(f)
+        hashes = {doc.get("hash") or chunk_hash(doc["content"]) for doc in documents}
+        return index, documents, hashes, mtime
+    
+    def _install(self, session_id: str, loaded: Tuple[Any, List[Dict], Set[str], float]):
+        index, documents, hashes, mtime = loaded
+        self.indexes[session_id] = index
+        self.documents[session_id] = documents
+        self.chunk_hashes[session_id] = hashes
+        self._loaded_mtimes[session_id] = mtime
+        self._track(session_id)
+    
+    def load_index(self, session_id: str):
+        loaded = self._read_index(session_id)
+        if loaded is None:
+            return False
+        self._install(session_id, loaded)
+        return True
+    
+    async def ensure_loaded(self, session_id: str) -> bool:
+        """
+        Makes a session's index resident, reading it from disk off the event
+        loop. A resident index is reused unless its files changed on disk
+        (e.g. written by another worker).
+        """
+        mtime = await asyncio.to_thread(self._persisted_mtime, session_id)
+        if mtime is None:
+            return session_id in self.indexes
+        if session_id in self.indexes and self._loaded_mtimes.get(session_id) == mtime:
             return True
-        return False
+        loaded = await asyncio.to_thread(self._read_index, session_id)
+        if loaded is None:
+            return False
+        self._install(session_id, loaded)
+        return True
+    
+    def evict(self, session_id: str):
+        """Drops a session's index from memory, keeping it on disk."""
+        self.indexes.pop(session_id, None)
+        self.documents.pop(session_id, None)
+        self.chunk_hashes.pop(session_id, None)
+        self._memory.pop(session_id, None)
+        self._loaded_mtimes.pop(session_id, None)
+        self._refresh_gauges()
+    
+    def delete_index_files(self, session_id: str) -> int:
+        """Removes a session's persisted index files, returning the bytes freed on disk."""
+        freed = 0
+        for path in self._paths(session_id):
+            try:
+                freed += os.path.getsize(path)
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        return freed
+    
+    def persisted_sessions(self, min_age_seconds: float = 0) -> Dict[str, int]:
+        """
+        Maps each session with files under FAISS_INDEX_PATH to their total size,
+        skipping files modified within the last ``min_age_seconds``.
+        """
+        cutoff = time.time() - min_age_seconds
+        sessions: Dict[str, int] = {}
+        with os.scandir(settings.FAISS_INDEX_PATH) as entries:
+            for entry in entries:
+                session_id, ext = os.path.splitext(entry.name)
+                if ext not in (".index", ".pkl") or not entry.is_file():
+                    continue
+                stat = entry.stat()
+                if stat.st_mtime > cutoff:
+                    continue
+                sessions[session_id] = sessions.get(session_id, 0) + stat.st_size
+        return sessions
+    
+    def persisted_bytes(self, session_id: str) -> int:
+        """Size of a session's index files on disk, used to estimate memory before loading."""
+        total = 0
+        for path in self._paths(session_id):
+            try:
+                total += os.path.getsize(path)
+            except FileNotFoundError:
+                pass
+        return total
+    
+    def memory_bytes(self, session_id: Optional[str] = None) -> int:
+        """
+        Approximates the memory held by a resident session index and its
+        chunks, or by all resident sessions when no session is given.
+        """
+        if session_id is None:
+            return sum(self._memory.values())
+        return self._memory.get(session_id, 0)
+    
+    def _track(self, session_id: str):
+        index = self.indexes[session_id]
+        vector_bytes = index.ntotal * index.d * 4
+        chunk_bytes = sum(len(doc["content"]) for doc in self.documents.get(session_id, []))
+        self._memory[session_id] = vector_bytes + chunk_bytes
+        self._refresh_gauges()
+    
+    def _refresh_gauges(self):
+        LOADED_INDEXES.set(len(self.indexes))
+        LOADED_INDEX_BYTES.set(self.memory_bytes())
 
 
 vector_store = VectorStore()
\ No newline at end of file
@@ -1,5 +1,6 @@
 from typing import Dict, Set
 from fastapi import WebSocket
+from app.metrics import ACTIVE_WEBSOCKETS
 
 
 class ConnectionManager:
@@ -13,10 +14,13 @@ class ConnectionManager:
             self.active_connections[session_id] = set()
         
         self.active_connections[session_id].add(websocket)
+        ACTIVE_WEBSOCKETS.inc()
     
     def disconnect(self, websocket: WebSocket, session_id: str):
         if session_id in self.active_connections:
-            self.active_connections[session_id].discard(websocket)
+            if websocket in self.active_connections[session_id]:
+                self.active_connections[session_id].discard(websocket)
+                ACTIVE_WEBSOCKETS.dec()
             
             if not self.active_connections[session_id]:
                 del self.active_connections[session_id]
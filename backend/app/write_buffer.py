@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+from pymongo import InsertOne, UpdateMany
+from bson import ObjectId
+
+from app.config import settings
+from app.database import Database
+from app.metrics import WRITE_BUFFER_BATCH_OPERATIONS, WRITE_BUFFER_FAILURES
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBuffer:
+    """
+    Write-behind buffer for chat message inserts and session ``updated_at``
+    bumps.
+
+    Operations are collected for at most ``max_delay_ms`` (or until
+    ``max_operations`` are pending) and written with one unordered
+    ``bulk_write`` per collection. Timestamp bumps for the same session
+    are coalesced and applied with ``$max`` so batches may land in any
+    order. Every enqueue returns a future that resolves once its batch is
+    written; callers that need read-your-writes await it, others don't.
+    """
+
+    def __init__(self, max_delay_ms: int, max_operations: int):
+        self.max_delay = max_delay_ms / 1000
+        self.max_operations = max_operations
+        self._messages: List[dict] = []
+        self._session_updates: Dict[str, datetime] = {}
+        self._sessions: Set[str] = set()
+        self._batch: Optional[asyncio.Future] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # Every unresolved batch holding messages of a session; flushes run
+        # concurrently, so an older batch may still be in flight
+        self._pending_by_session: Dict[str, Set[asyncio.Future]] = {}
+        self._flushes: Set[asyncio.Task] = set()
+
+    @property
+    def pending(self) -> int:
+        return len(self._messages) + len(self._session_updates)
+
+    def _enqueue(self) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        if self._batch is None:
+            self._batch = loop.create_future()
+            if self.max_delay > 0:
+                self._timer = loop.call_later(self.max_delay, self._schedule_flush)
+        batch = self._batch
+        if self.max_delay <= 0 or self.pending >= self.max_operations:
+            self._schedule_flush()
+        return batch
+
+    def insert_message(self, message: dict) -> asyncio.Future:
+        self._messages.append(message)
+        batch = self._enqueue()
+        self._sessions.add(message["session_id"])
+        self._pending_by_session.setdefault(message["session_id"], set()).add(batch)
+        return batch
+
+    def touch_session(self, session_id: str, updated_at: Optional[datetime] = None) -> asyncio.Future:
+        updated_at = updated_at or datetime.utcnow()
+        previous = self._session_updates.get(session_id)
+        self._session_updates[session_id] = max(previous, updated_at) if previous else updated_at
+        return self._enqueue()
+
+    async def wait_for_session(self, session_id: str):
+        """Waits until every message buffered so far for the session has been flushed."""
+        batches = self._pending_by_session.get(session_id)
+        if batches:
+            await asyncio.wait(list(batches))
+
+    def _schedule_flush(self):
+        task = asyncio.create_task(self.flush())
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def flush(self):
+        if self._batch is None:
+            return
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        messages, self._messages = self._messages, []
+        session_updates, self._session_updates = self._session_updates, {}
+        sessions, self._sessions = self._sessions, set()
+        batch, self._batch = self._batch, None
+
+        started = time.perf_counter()
+        try:
+            db = Database.get_database()
+            writes = []
+            if messages:
+                writes.append(db.messages.bulk_write(
+                    [InsertOne(message) for message in messages], ordered=False
+                ))
+            if session_updates:
+                # UpdateMany on _id matches one document; unlike UpdateOne it also
+                # works with the mongomock-motor client the benchmarks use
+                writes.append(db.chat_sessions.bulk_write([
+                    UpdateMany({"_id": ObjectId(session_id)}, {"$max": {"updated_at": updated_at}})
+                    for session_id, updated_at in session_updates.items()
+                ], ordered=False))
+            results = await asyncio.gather(*writes, return_exceptions=True)
+            for result in results:
+                if isinstance(result, BaseException):
+                    raise result
+            WRITE_BUFFER_BATCH_OPERATIONS.observe(len(messages) + len(session_updates))
+            batch.set_result(None)
+        except Exception as e:
+            WRITE_BUFFER_FAILURES.inc()
+            logger.exception(
+                "Write buffer flush of %d messages and %d session updates failed after %.3fs",
+                len(messages), len(session_updates), time.perf_counter() - started
+            )
+            batch.set_exception(e)
+            # Mark the exception retrieved; only callers that await the batch should see it
+            batch.exception()
+
+        for session_id in sessions:
+            batches = self._pending_by_session.get(session_id)
+            if batches is not None:
+                batches.discard(batch)
+                if not batches:
+                    del self._pending_by_session[session_id]
+
+    async def close(self):
+        """Flushes everything still buffered and waits for in-flight flushes."""
+        await self.flush()
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+
+
+write_buffer = WriteBuffer(
+    max_delay_ms=settings.WRITE_BUFFER_MAX_DELAY_MS,
+    max_operations=settings.WRITE_BUFFER_MAX_OPERATIONS,
+)
@@ -0,0 +1,168 @@
+"""
+Compares the legacy character splitter with the structure-aware token chunker.
+
+For each strategy it reports chunk count, embedded tokens and estimated
+embedding cost (after deduplication), the share of duplicate chunks
+skipped, and retrieval recall@k. Embeddings come from the fake OpenAI
+server's deterministic bag-of-words embedder, so no network is needed.
+
+    cd backend
+    python -m benchmarks.chunking_benchmark
+    python -m benchmarks.chunking_benchmark --files ~/docs/*.pdf --chunk-tokens 300
+
+The synthetic corpus embeds one retrievable fact per section plus repeated
+page boilerplate; recall is only measured on that corpus.
+"""
+import argparse
+import json
+import os
+import random
+from typing import Dict, List, Tuple
+
+import faiss
+import numpy as np
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from app.chunking import Block, TokenChunker, Tokenizer, blocks_to_text, chunk_hash
+from app.extraction import extract_blocks
+from benchmarks.fake_openai import embed_text
+
+
+TOPICS = [
+    "revenue forecast", "incident response", "employee onboarding", "database migration",
+    "vendor security", "leave policy", "release process", "customer churn",
+    "capacity planning", "api deprecation", "travel expenses", "data retention",
+]
+FILLER = (
+    "The committee reviewed the current state of the {topic} and agreed on next steps. "
+    "Owners will report progress in the weekly sync and escalate blockers early. "
+    "Historical context and prior decisions are summarized in the appendix for reference."
+)
+BOILERPLATE = "Confidential - internal use only. Do not distribute outside the organization."
+
+
+def synthetic_corpus(documents: int, sections: int, seed: int) -> Tuple[List[List[Block]], List[Dict]]:
+    """Builds paged documents with headings, tables and one unique fact per section."""
+    rng = random.Random(seed)
+    corpus, facts = [], []
+    for d in range(documents):
+        blocks = []
+        for s in range(sections):
+            page = s // 2 + 1
+            topic = TOPICS[(d + s) % len(TOPICS)]
+            heading = f"Section {s + 1}: {topic.title()} (document {d + 1})"
+            code = f"K{d:02d}{s:02d}{rng.randint(1000, 9999)}"
+            blocks.append(Block(text=heading, kind="heading", page=page, heading=heading))
+            for p in range(rng.randint(2, 4)):
+                blocks.append(Block(text=FILLER.format(topic=topic), page=page, heading=heading))
+            blocks.append(Block(
+                text=f"The approval code for the {topic} in document {d + 1} is {code}.",
+                page=page, heading=heading
+            ))
+            rows = [f"Metric | Q{q} | {rng.randint(10, 99)}" for q in range(1, 5)]
+            blocks.append(Block(text="\n".join(["Metric | Quarter | Value"] + rows), kind="table", page=page, heading=heading))
+            if s % 2 == 1:
+                blocks.append(Block(text=BOILERPLATE, page=page, heading=heading))
+            facts.append({"query": f"What is the approval code for the {topic} in document {d + 1}?", "answer": code})
+        corpus.append(blocks)
+    return corpus, facts
+
+
+def character_chunks(corpus: List[List[Block]], size: int, overlap: int) -> List[str]:
+    splitter = RecursiveCharacterTextSplitter(chunk_size=size, chunk_overlap=overlap)
+    return [chunk for blocks in corpus for chunk in splitter.split_text(blocks_to_text(blocks))]
+
+
+def token_chunks(corpus: List[List[Block]], chunker: TokenChunker) -> List[str]:
+    return [chunk.text for blocks in corpus for chunk in chunker.chunk(blocks)]
+
+
+def deduplicate(chunks: List[str]) -> List[str]:
+    seen, unique = set(), []
+    for chunk in chunks:
+        digest = chunk_hash(chunk)
+        if digest not in seen:
+            seen.add(digest)
+            unique.append(chunk)
+    return unique
+
+
+def recall_at_k(chunks: List[str], facts: List[Dict], k: int, dimension: int) -> float:
+    if not facts or not chunks:
+        return None
+    index = faiss.IndexFlatL2(dimension)
+    index.add(np.array([embed_text(chunk, dimension) for chunk in chunks], dtype="float32"))
+    hits = 0
+    for fact in facts:
+        query = np.array([embed_text(fact["query"], dimension)], dtype="float32")
+        _, indices = index.search(query, k)
+        if any(0 <= i < len(chunks) and fact["answer"] in chunks[i] for i in indices[0]):
+            hits += 1
+    return round(hits / len(facts), 4)
+
+
+def evaluate(name: str, chunks: List[str], dedupe: bool, source_tokens: int, facts, args, tokenizer) -> Dict:
+    embedded = deduplicate(chunks) if dedupe else chunks
+    tokens = sum(tokenizer.count(chunk) for chunk in embedded)
+    return {
+        "strategy": name,
+        "chunks": len(chunks),
+        "embedded_chunks": len(embedded),
+        "duplicates_skipped": len(chunks) - len(embedded),
+        "embedded_tokens": tokens,
+        "token_amplification": round(tokens / source_tokens, 3) if source_tokens else None,
+        "estimated_cost_usd": round(tokens / 1_000_000 * args.price_per_million, 6),
+        f"recall_at_{args.k}": recall_at_k(embedded, facts, args.k, args.dimension),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chunking strategy benchmark")
+    parser.add_argument("--files", nargs="*", help="PDF/DOCX/TXT files to use instead of the synthetic corpus")
+    parser.add_argument("--documents", type=int, default=20)
+    parser.add_argument("--sections", type=int, default=12)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Legacy splitter size in characters")
+    parser.add_argument("--chunk-overlap", type=int, default=200, help="Legacy splitter overlap in characters")
+    parser.add_argument("--chunk-tokens", type=int, default=400)
+    parser.add_argument("--overlap-tokens", type=int, default=40)
+    parser.add_argument("--encoding", default="cl100k_base")
+    parser.add_argument("--price-per-million", type=float, default=0.13, help="Embedding price per 1M tokens")
+    parser.add_argument("--dimension", type=int, default=256)
+    parser.add_argument("-k", type=int, default=4)
+    parser.add_argument("--output", help="Write the JSON report to this path")
+    args = parser.parse_args()
+
+    if args.files:
+        corpus = []
+        for path in args.files:
+            with open(path, "rb") as f:
+                corpus.append(extract_blocks(os.path.basename(path), f.read()))
+        facts = []
+    else:
+        corpus, facts = synthetic_corpus(args.documents, args.sections, args.seed)
+
+    tokenizer = Tokenizer(args.encoding)
+    chunker = TokenChunker(tokenizer, args.chunk_tokens, args.overlap_tokens)
+    source_tokens = sum(tokenizer.count(blocks_to_text(blocks)) for blocks in corpus)
+
+    report = {
+        "tokenizer": tokenizer.name,
+        "documents": len(corpus),
+        "source_tokens": source_tokens,
+        "queries": len(facts),
+        "results": [
+            evaluate("character", character_chunks(corpus, args.chunk_size, args.chunk_overlap),
+                     False, source_tokens, facts, args, tokenizer),
+            evaluate("token", token_chunks(corpus, chunker), True, source_tokens, facts, args, tokenizer),
+        ],
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Deterministic OpenAI-compatible stand-in for benchmarks.
+
+Serves /v1/embeddings and /v1/chat/completions (streaming and non-streaming)
+with configurable latency so load runs are reproducible and offline.
+
+    python -m benchmarks.fake_openai --port 9100 --first-token-ms 300 --token-ms 20
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import re
+import time
+import uuid
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+class FakeConfig:
+    dimension: int = 256
+    embedding_ms: float = 50.0
+    first_token_ms: float = 300.0
+    token_ms: float = 20.0
+    tokens: int = 60
+
+
+config = FakeConfig()
+
+
+def embed_text(text: str, dimension: int) -> list:
+    """Hashes words into a normalized bag-of-words vector so retrieval stays meaningful."""
+    vector = [0.0] * dimension
+    for word in WORD_PATTERN.findall(text.lower()):
+        digest = hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest()
+        bucket = int.from_bytes(digest[:4], "little") % dimension
+        sign = 1.0 if digest[4] & 1 else -1.0
+        vector[bucket] += sign
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+def response_tokens(prompt: str) -> list:
+    """Builds a deterministic token stream derived from the prompt."""
+    seed = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    return [f"{seed[i % len(seed)]}tok{i} " for i in range(config.tokens)]
+
+
+async def embeddings(request: Request):
+    body = await request.json()
+    inputs = body["input"]
+    if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+        inputs = [inputs]
+
+    await asyncio.sleep(config.embedding_ms / 1000)
+
+    texts = [item if isinstance(item, str) else " ".join(str(t) for t in item) for item in inputs]
+    data = [
+        {"object": "embedding", "index": i, "embedding": embed_text(text, config.dimension)}
+        for i, text in enumerate(texts)
+    ]
+
+    tokens = sum(len(WORD_PATTERN.findall(text)) for text in texts)
+    return JSONResponse({
+        "object": "list",
+        "data": data,
+        "model": body.get("model", "fake-embedding"),
+        "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+    })
+
+
+async def chat_completions(request: Request):
+    body = await request.json()
+    prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+    tokens = response_tokens(prompt)
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    created = int(time.time())
+    model = body.get("model", "fake-model")
+
+    if not body.get("stream"):
+        await asyncio.sleep((config.first_token_ms + config.token_ms * len(tokens)) / 1000)
+        return JSONResponse({
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "".join(tokens).strip()},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": len(prompt.split()),
+                "completion_tokens": len(tokens),
+                "total_tokens": len(prompt.split()) + len(tokens),
+            },
+        })
+
+    def chunk(delta: dict, finish_reason=None) -> str:
+        payload = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        return f"data: {json.dumps(payload)}\n\n"
+
+    async def stream():
+        await asyncio.sleep(config.first_token_ms / 1000)
+        yield chunk({"role": "assistant", "content": ""})
+        for i, token in enumerate(tokens):
+            if i:
+                await asyncio.sleep(config.token_ms / 1000)
+            yield chunk({"content": token})
+        yield chunk({}, finish_reason="stop")
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
+
+async def health(request: Request):
+    return JSONResponse({"status": "healthy"})
+
+
+app = Starlette(routes=[
+    Route("/v1/embeddings", embeddings, methods=["POST"]),
+    Route("/v1/chat/completions", chat_completions, methods=["POST"]),
+    Route("/health", health),
+])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--dimension", type=int, default=config.dimension)
+    parser.add_argument("--embedding-ms", type=float, default=config.embedding_ms)
+    parser.add_argument("--first-token-ms", type=float, default=config.first_token_ms)
+    parser.add_argument("--token-ms", type=float, default=config.token_ms)
+    parser.add_argument("--tokens", type=int, default=config.tokens)
+    args = parser.parse_args()
+
+    config.dimension = args.dimension
+    config.embedding_ms = args.embedding_ms
+    config.first_token_ms = args.first_token_ms
+    config.token_ms = args.token_ms
+    config.tokens = args.tokens
+
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
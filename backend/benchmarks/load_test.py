@@ -0,0 +1,358 @@
+"""
+End-to-end load benchmark for the chat API.
+
+Starts the fake OpenAI server and the API in subprocesses, then drives
+concurrent users through register -> create session -> upload -> WebSocket
+chat and reports throughput, latency percentiles, queueing/shedding under
+the LLM admission limits and server memory.
+
+    cd backend
+    python -m benchmarks.load_test --users 20 --turns 5
+    python -m benchmarks.load_test --users 40 --llm-concurrency 4 --llm-queue-slo 5
+    python -m benchmarks.load_test --save-baseline benchmarks/baselines/default.json
+    python -m benchmarks.load_test --compare benchmarks/baselines/default.json
+
+``--compare`` exits with status 1 when a tracked metric regresses by more
+than ``--tolerance``.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from typing import Dict, List, Optional
+
+import httpx
+import websockets
+
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# metric name -> True when higher is better
+TRACKED_METRICS = {
+    "throughput_turns_per_s": True,
+    "ttft_ms.p50": False,
+    "ttft_ms.p99": False,
+    "turn_ms.p50": False,
+    "turn_ms.p99": False,
+    "upload_ms.p50": False,
+    "upload_ms.p99": False,
+    "server_peak_rss_mb": False,
+}
+
+TOPICS = [
+    "quarterly revenue forecast", "incident response runbook", "onboarding checklist",
+    "database migration plan", "vendor security review", "holiday leave policy",
+    "release notes summary", "customer churn analysis", "capacity planning model",
+    "api deprecation schedule",
+]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile; returns None for an empty sample."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return round(ordered[rank], 2)
+
+
+def summarize(values: List[float]) -> Dict:
+    return {
+        "count": len(values),
+        "p50": percentile(values, 50),
+        "p90": percentile(values, 90),
+        "p99": percentile(values, 99),
+        "max": round(max(values), 2) if values else None,
+    }
+
+
+def process_memory_mb(pid: int) -> Dict:
+    """Reads current and peak RSS of a process from /proc (Linux only)."""
+    status_path = f"/proc/{pid}/status"
+    if not os.path.exists(status_path):
+        return {"rss_mb": None, "peak_rss_mb": None}
+    values = {}
+    with open(status_path) as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            if key in ("VmRSS", "VmHWM"):
+                values[key] = round(int(rest.split()[0]) / 1024, 1)
+    return {"rss_mb": values.get("VmRSS"), "peak_rss_mb": values.get("VmHWM")}
+
+
+def synthetic_document(user_index: int, paragraphs: int) -> str:
+    lines = []
+    for p in range(paragraphs):
+        topic = TOPICS[(user_index + p) % len(TOPICS)]
+        lines.append(
+            f"Section {p + 1}: {topic}. This paragraph describes the {topic} "
+            f"owned by team {user_index} with reference code R{user_index}-{p}. "
+            f"Key figures for the {topic} are tracked weekly and reviewed monthly."
+        )
+    return "\n\n".join(lines)
+
+
+async def wait_until_healthy(url: str, process: subprocess.Popen, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"Process for {url} exited with code {process.returncode}")
+            try:
+                response = await client.get(url)
+                if response.status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise TimeoutError(f"{url} did not become healthy within {timeout}s")
+
+
+class UserRun:
+    def __init__(self):
+        self.timings: Dict[str, List[float]] = {
+            "register_ms": [], "session_ms": [], "upload_ms": [], "ttft_ms": [], "turn_ms": []
+        }
+        self.turns = 0
+        self.queued_turns = 0
+        self.shed_turns = 0
+        self.max_queue_position = 0
+        self.errors: List[str] = []
+
+
+async def drive_user(index: int, args, base_url: str, ws_url: str, run: UserRun):
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+        try:
+            tag = uuid.uuid4().hex[:8]
+            started = time.perf_counter()
+            response = await client.post("/api/auth/register", json={
+                "username": f"bench-{tag}",
+                "email": f"bench-{tag}@example.com",
+                "password": "benchmark-password",
+            })
+            response.raise_for_status()
+            run.timings["register_ms"].append((time.perf_counter() - started) * 1000)
+            token = response.json()["access_token"]
+            headers = {"Authorization": f"Bearer {token}"}
+
+            started = time.perf_counter()
+            response = await client.post("/api/chat/sessions", headers=headers)
+            response.raise_for_status()
+            run.timings["session_ms"].append((time.perf_counter() - started) * 1000)
+            session_id = response.json()["session_id"]
+
+            for f in range(args.files):
+                document = synthetic_document(index + f, args.paragraphs)
+                started = time.perf_counter()
+                response = await client.post(
+                    f"/api/files/upload/{session_id}",
+                    headers=headers,
+                    files={"file": (f"doc-{index}-{f}.txt", document.encode("utf-8"), "text/plain")},
+                )
+                response.raise_for_status()
+                run.timings["upload_ms"].append((time.perf_counter() - started) * 1000)
+
+            async with websockets.connect(f"{ws_url}/api/chat/ws/{session_id}?token={token}") as ws:
+                for turn in range(args.turns):
+                    topic = TOPICS[(index + turn) % len(TOPICS)]
+                    started = time.perf_counter()
+                    await ws.send(json.dumps({"content": f"What does the document say about the {topic}?"}))
+                    first_token = None
+                    queued = shed = False
+                    while True:
+                        event = json.loads(await ws.recv())
+                        if event["type"] == "chunk" and first_token is None:
+                            first_token = time.perf_counter()
+                        elif event["type"] == "queued":
+                            queued = True
+                            run.max_queue_position = max(run.max_queue_position, event["position"])
+                        elif event["type"] == "error":
+                            shed = True
+                        elif event["type"] == "end":
+                            break
+                    finished = time.perf_counter()
+                    run.queued_turns += queued
+                    if shed:
+                        run.shed_turns += 1
+                        continue
+                    if first_token is not None:
+                        run.timings["ttft_ms"].append((first_token - started) * 1000)
+                    run.timings["turn_ms"].append((finished - started) * 1000)
+                    run.turns += 1
+        except Exception as e:
+            run.errors.append(f"user {index}: {type(e).__name__}: {e}")
+
+
+async def run_benchmark(args) -> Dict:
+    fake_port = args.fake_port or free_port()
+    app_port = args.app_port or free_port()
+    index_dir = tempfile.mkdtemp(prefix="bench-faiss-")
+
+    env = dict(os.environ)
+    env.update({
+        "MONGODB_URI": env.get("MONGODB_URI", "mongodb://127.0.0.1:27017"),
+        "MONGODB_DB_NAME": f"bench_{uuid.uuid4().hex[:8]}",
+        "OPENAI_API_KEY": "sk-benchmark",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{fake_port}/v1",
+        "OPENAI_MODEL": "fake-model",
+        "EMBEDDING_CHECK_CTX_LENGTH": "false",
+        "JWT_SECRET_KEY": "benchmark-secret",
+        "FAISS_INDEX_PATH": index_dir,
+        "BLOB_STORE_PATH": os.path.join(index_dir, "blobs"),
+        "LLM_MAX_CONCURRENCY": str(args.llm_concurrency),
+        "LLM_MAX_CONCURRENCY_PER_USER": str(args.llm_concurrency_per_user),
+        "LLM_QUEUE_SLO_SECONDS": str(args.llm_queue_slo),
+    })
+
+    log_path = os.path.join(index_dir, "server.log")
+    log_file = open(log_path, "w")
+    fake = subprocess.Popen([
+        sys.executable, "-m", "benchmarks.fake_openai", "--port", str(fake_port),
+        "--first-token-ms", str(args.first_token_ms), "--token-ms", str(args.token_ms),
+        "--tokens", str(args.tokens), "--embedding-ms", str(args.embedding_ms),
+    ], cwd=BACKEND_DIR, env=env, stdout=log_file, stderr=subprocess.STDOUT)
+    server = subprocess.Popen([
+        sys.executable, "-m", "benchmarks.serve_app", "--port", str(app_port), "--mongo", args.mongo,
+    ], cwd=BACKEND_DIR, env=env, stdout=log_file, stderr=subprocess.STDOUT)
+
+    try:
+        await wait_until_healthy(f"http://127.0.0.1:{fake_port}/health", fake)
+        await wait_until_healthy(f"http://127.0.0.1:{app_port}/health", server)
+        idle_memory = process_memory_mb(server.pid)
+
+        runs = [UserRun() for _ in range(args.users)]
+        started = time.perf_counter()
+        await asyncio.gather(*[
+            drive_user(i, args, f"http://127.0.0.1:{app_port}", f"ws://127.0.0.1:{app_port}", runs[i])
+            for i in range(args.users)
+        ])
+        wall_seconds = time.perf_counter() - started
+        memory = process_memory_mb(server.pid)
+    finally:
+        for process in (server, fake):
+            process.terminate()
+        for process in (server, fake):
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        log_file.close()
+
+    timings: Dict[str, List[float]] = {}
+    for run in runs:
+        for name, values in run.timings.items():
+            timings.setdefault(name, []).extend(values)
+    turns = sum(run.turns for run in runs)
+    errors = [error for run in runs for error in run.errors]
+    if errors:
+        print(f"server log: {log_path}", file=sys.stderr)
+
+    return {
+        "config": {
+            "users": args.users, "turns": args.turns, "files": args.files,
+            "paragraphs": args.paragraphs, "mongo": "mock" if args.mongo == "mock" else "mongod",
+            "first_token_ms": args.first_token_ms, "token_ms": args.token_ms,
+            "tokens": args.tokens, "embedding_ms": args.embedding_ms,
+            "llm_concurrency": args.llm_concurrency,
+            "llm_concurrency_per_user": args.llm_concurrency_per_user,
+            "llm_queue_slo": args.llm_queue_slo,
+        },
+        "environment": {"python": platform.python_version(), "platform": platform.platform()},
+        "wall_seconds": round(wall_seconds, 2),
+        "turns": turns,
+        "errors": errors,
+        "queued_turns": sum(run.queued_turns for run in runs),
+        "shed_turns": sum(run.shed_turns for run in runs),
+        "max_queue_position": max((run.max_queue_position for run in runs), default=0),
+        "throughput_turns_per_s": round(turns / wall_seconds, 3) if wall_seconds else None,
+        **{name: summarize(values) for name, values in timings.items()},
+        "server_idle_rss_mb": idle_memory["rss_mb"],
+        "server_rss_mb": memory["rss_mb"],
+        "server_peak_rss_mb": memory["peak_rss_mb"],
+    }
+
+
+def lookup(result: Dict, dotted: str):
+    value = result
+    for part in dotted.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def compare(result: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Returns a line per tracked metric and marks those that regressed beyond tolerance."""
+    lines = []
+    for name, higher_is_better in TRACKED_METRICS.items():
+        current, previous = lookup(result, name), lookup(baseline, name)
+        if current is None or not previous:
+            continue
+        change = (current - previous) / previous
+        regressed = change < -tolerance if higher_is_better else change > tolerance
+        marker = "REGRESSION" if regressed else "ok"
+        lines.append(f"{marker:<10} {name:<26} {previous:>10} -> {current:<10} ({change:+.1%})")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load benchmark against fake LLM/embedding servers")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--files", type=int, default=1, help="Files uploaded per user")
+    parser.add_argument("--paragraphs", type=int, default=40, help="Paragraphs per uploaded file")
+    parser.add_argument("--mongo", default="mock", help="'mock' for mongomock-motor or a MongoDB URI")
+    parser.add_argument("--first-token-ms", type=float, default=300.0)
+    parser.add_argument("--token-ms", type=float, default=20.0)
+    parser.add_argument("--tokens", type=int, default=60)
+    parser.add_argument("--embedding-ms", type=float, default=50.0)
+    parser.add_argument("--llm-concurrency", type=int, default=16, help="Server-wide generation slots")
+    parser.add_argument("--llm-concurrency-per-user", type=int, default=2)
+    parser.add_argument("--llm-queue-slo", type=float, default=30.0, help="Shed turns expected to queue longer (0 disables)")
+    parser.add_argument("--fake-port", type=int, default=0)
+    parser.add_argument("--app-port", type=int, default=0)
+    parser.add_argument("--output", help="Write the JSON report to this path")
+    parser.add_argument("--save-baseline", help="Write the JSON report as a baseline to this path")
+    parser.add_argument("--compare", help="Baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression")
+    args = parser.parse_args()
+
+    result = asyncio.run(run_benchmark(args))
+    report = json.dumps(result, indent=2)
+    print(report)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(report + "\n")
+
+    exit_code = 1 if result["errors"] else 0
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get("config") != result["config"]:
+            print("warning: baseline was recorded with a different configuration", file=sys.stderr)
+        lines = compare(result, baseline, args.tolerance)
+        print("\n".join(lines))
+        if any(line.startswith("REGRESSION") for line in lines):
+            exit_code = 1
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Boots app.main:app for benchmarks, optionally against an in-memory MongoDB.
+
+    python -m benchmarks.serve_app --port 8101 --mongo mock
+
+Configuration comes from the environment exactly as for run.py; with
+``--mongo mock`` the Motor client is replaced by mongomock-motor so no
+mongod is needed. Any other value is treated as a MongoDB URI.
+"""
+import argparse
+import os
+
+import uvicorn
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the API for benchmarking")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8101)
+    parser.add_argument("--mongo", default="mock", help="'mock' or a MongoDB URI")
+    args = parser.parse_args()
+
+    if args.mongo != "mock":
+        os.environ["MONGODB_URI"] = args.mongo
+
+    from app.database import Database
+    from app.main import app
+
+    if args.mongo == "mock":
+        from mongomock_motor import AsyncMongoMockClient
+
+        async def connect_mock_db():
+            Database.client = AsyncMongoMockClient()
+
+        Database.connect_db = connect_mock_db
+
+    uvicorn.run(
+        app,
+        host=args.host,
+        port=args.port,
+        log_level="warning",
+        ws_ping_interval=20,
+        ws_ping_timeout=20
+    )
+
+
+if __name__ == "__main__":
+    main()
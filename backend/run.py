@@ -1,5 +1,6 @@
 import uvicorn
 from app.config import settings
+from app.logging_config import build_logging_config
 
 if __name__ == "__main__":
     uvicorn.run(
@@ -7,6 +8,7 @@ if __name__ == "__main__":
         host=settings.HOST,
         port=settings.PORT,
         reload=settings.DEBUG,
+        log_config=build_logging_config(),
         ws_ping_interval=20,
         ws_ping_timeout=20
     )
\ No newline at end of file
@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useCallback } from 'react';
+import React, { useState, useEffect, useCallback, useRef } from 'react';
 import { Message } from '../types';
 import { chatAPI } from '../services/api';
 import { wsService } from '../services/websocket';
@@ -16,14 +16,29 @@ export const Chat: React.FC = () => {
   const [isStreaming, setIsStreaming] = useState(false);
   const [loading, setLoading] = useState(true);
   const [showWelcome, setShowWelcome] = useState(true);
+  const [olderCursor, setOlderCursor] = useState<string | null>(null);
+  const loadedOlder = useRef(false);
   const { user } = useAuth();
 
-  const loadMessages = async (sessionId: string) => {
+  // Loads the newest page. With keepOlder, older pages already shown stay in place.
+  const loadMessages = async (sessionId: string, keepOlder: boolean = false) => {
     try {
       const response = await chatAPI.getMessages(sessionId);
-      setMessages(response.data);
+      const page: Message[] = response.data;
+      const cursor = response.headers['x-next-cursor'] || null;
+      if (keepOlder && loadedOlder.current && page.length > 0) {
+        const pageIds = new Set(page.map((m) => m.id));
+        setMessages((prev) => [
+          ...prev.filter((m) => !pageIds.has(m.id) && m.timestamp < page[0].timestamp),
+          ...page,
+        ]);
+      } else {
+        loadedOlder.current = false;
+        setMessages(page);
+        setOlderCursor(cursor);
+      }
       // If session has messages, don't show welcome screen
-      if (response.data.length > 0) {
+      if (page.length > 0) {
         setShowWelcome(false);
       }
     } catch (error) {
@@ -31,6 +46,18 @@ export const Chat: React.FC = () => {
     }
   };
 
+  const loadOlderMessages = async () => {
+    if (!currentSessionId || !olderCursor) return;
+    try {
+      const response = await chatAPI.getMessages(currentSessionId, olderCursor);
+      loadedOlder.current = true;
+      setMessages((prev) => [...response.data, ...prev]);
+      setOlderCursor(response.headers['x-next-cursor'] || null);
+    } catch (error) {
+      console.error('Failed to load older messages:', error);
+    }
+  };
+
   const handleSelectSession = useCallback(async (sessionId: string) => {
     // Disconnect existing connection first
     wsService.disconnect();
@@ -55,10 +82,12 @@ export const Chat: React.FC = () => {
       if (data.type === 'chunk') {
         setStreamingContent((prev) => prev + data.content);
         setIsStreaming(true);
+      } else if (data.type === 'error') {
+        alert(data.content);
       } else if (data.type === 'end') {
         setStreamingContent('');
         setIsStreaming(false);
-        loadMessages(sessionId);
+        loadMessages(sessionId, true);
       }
     });
   }, []);
@@ -191,6 +220,7 @@ export const Chat: React.FC = () => {
                 messages={messages} 
                 streamingContent={streamingContent}
                 onResendMessage={handleResendMessage}
+                onLoadOlder={olderCursor ? loadOlderMessages : undefined}
               />
             )}
             <MessageInput 
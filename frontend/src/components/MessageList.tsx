@@ -6,6 +6,7 @@ interface MessageListProps {
   messages: Message[];
   streamingContent: string;
   onResendMessage?: (content: string) => void;
+  onLoadOlder?: () => void;
 }
 
 // Simple markdown formatter - no LaTeX, just clean readable text
@@ -426,12 +427,13 @@ const MessageBubble: React.FC<{
   );
 };
 
-export const MessageList: React.FC<MessageListProps> = ({ messages, streamingContent, onResendMessage }) => {
+export const MessageList: React.FC<MessageListProps> = ({ messages, streamingContent, onResendMessage, onLoadOlder }) => {
   const messagesEndRef = useRef<HTMLDivElement>(null);
 
+  // Keyed on the newest message so prepending older pages keeps the scroll position
   useEffect(() => {
     messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' });
-  }, [messages, streamingContent]);
+  }, [messages[messages.length - 1]?.id, streamingContent]);
 
   return (
     <div style={{ 
@@ -440,6 +442,25 @@ export const MessageList: React.FC<MessageListProps> = ({ messages, streamingCon
       padding: '1.5rem',
       background: 'var(--bg-100)'
     }}>
+      {onLoadOlder && (
+        <div style={{ textAlign: 'center', marginBottom: '1rem' }}>
+          <button
+            onClick={onLoadOlder}
+            style={{
+              padding: '0.5rem 1rem',
+              background: 'var(--bg-200)',
+              color: 'var(--text-200)',
+              border: '1px solid var(--bg-300)',
+              borderRadius: '8px',
+              cursor: 'pointer',
+              fontSize: '0.85rem'
+            }}
+          >
+            Load older messages
+          </button>
+        </div>
+      )}
+      
       {messages.map((message) => (
         <MessageBubble
           key={message.id}
@@ -51,8 +51,11 @@ export const chatAPI = {
   
   getSessions: () => api.get('/api/chat/sessions'),
   
-  getMessages: (sessionId: string) =>
-    api.get(`/api/chat/sessions/${sessionId}/messages`),
+  // Newest page by default; pass the X-Next-Cursor of a page to fetch older messages
+  getMessages: (sessionId: string, cursor?: string) =>
+    api.get(`/api/chat/sessions/${sessionId}/messages`, {
+      params: cursor ? { cursor } : undefined,
+    }),
   
   deleteSession: (sessionId: string) =>
     api.delete(`/api/chat/sessions/${sessionId}`),